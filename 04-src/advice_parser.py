@@ -1,18 +1,82 @@
+import glob
+import json
+import numpy as np
+import os
 import re
 from model import Cell, Advice, AdvisorInput
 
+ADVICE_PATTERN = re.compile(r'\[\s*(\d+)\s*,\s*(\d+)\s*\],?\s+([+-]?\d+)')
+
+"""
+Advice of one advisor as NumPy arrays: the row, column and value of every piece of advice
+"""
+class AdviceTable():
+
+    def __init__(self, map_size: int, rows, cols, values):
+        self.map_size = map_size
+        self.rows = np.asarray(rows, dtype=int)
+        self.cols = np.asarray(cols, dtype=int)
+        self.values = np.asarray(values, dtype=int)
+
+    def __len__(self):
+        return len(self.values)
+
+    def __str__(self):
+        return f'Advice table with {len(self)} pieces of advice.'
+
+    def to_advisor_input(self):
+        advice_list = [Advice(Cell(row, col, self.map_size), value)
+            for row, col, value in zip(self.rows.tolist(), self.cols.tolist(), self.values.tolist())]
+
+        return AdvisorInput(self.map_size, advice_list)
+
 
 class AdviceParser():
 
     def parse(self, file):
+        return self.load(file).to_advisor_input()
+
+    def load(self, file):
         with open(file, 'r') as f:
-            map_size = f.readline()
-            advice_list = []
-            for line in f:
-                [cell, value] = re.split(r' ', line)
-                coordinates = re.search(r'[0-9]+,[0-9]+', cell)
-                [y, x] = re.split(r',', coordinates.group(0))
-                cell = Cell(int(y), int(x), int(map_size))
-                advice_list.append(Advice(cell, int(value)))
-                
-        return AdvisorInput(int(map_size), advice_list)
+            map_size = int(f.readline())
+            advice = []
+            for line_number, line in enumerate(f, start=2):
+                if not line.strip():
+                    continue
+                match = ADVICE_PATTERN.fullmatch(line.strip())
+                if match is None:
+                    raise ValueError(f'Malformed advice in {file}, line {line_number}: {line.strip()}')
+                advice.append(match.groups())
+            advice = np.array(advice, dtype=int).reshape(-1, 3)
+
+        return AdviceTable(map_size, advice[:, 0], advice[:, 1], advice[:, 2])
+
+    def load_directory(self, folder, size, seed, cache=False):
+        '''
+        Loads every advice-{size}x{size}-seed{seed}-*.txt file of the folder, keyed by the rest of the file name
+        (e.g. all, human10, coop10-A1-topleft). With cache, the arrays of all files are kept in one .npz file in
+        {folder}/.advice-cache, which is reused as long as no advice file has been added, removed or modified.
+        '''
+        prefix = f'advice-{size}x{size}-seed{seed}-'
+        files = sorted(glob.glob(os.path.join(glob.escape(folder), f'{prefix}*.txt')))
+        names = [os.path.basename(file)[len(prefix):-len('.txt')] for file in files]
+        if not cache:
+            return {name: self.load(file) for name, file in zip(names, files)}
+
+        cache_key = json.dumps([[name, os.stat(file).st_mtime_ns, os.stat(file).st_size] for name, file in zip(names, files)])
+        cache_file = os.path.abspath(f'{folder}/.advice-cache/{prefix[:-1]}.npz')
+        if os.path.exists(cache_file):
+            with np.load(cache_file) as cached_advice:
+                if str(cached_advice['key']) == cache_key:
+                    return {name: AdviceTable(int(cached_advice['map_sizes'][i]), *cached_advice[f'advice_{i}'].T)
+                        for i, name in enumerate(names)}
+
+        advice_tables = {name: self.load(file) for name, file in zip(names, files)}
+
+        os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+        arrays = {f'advice_{i}': np.stack([table.rows, table.cols, table.values], axis=1) for i, table in enumerate(advice_tables.values())}
+        with open(f'{cache_file}.{os.getpid()}.tmp', 'wb') as file:
+            np.savez(file, key=np.array(cache_key), map_sizes=np.array([table.map_size for table in advice_tables.values()], dtype=int), **arrays)
+        os.replace(f'{cache_file}.{os.getpid()}.tmp', cache_file)
+
+        return advice_tables
@@ -1,79 +1,66 @@
 import argparse
+import numpy as np
 import os
+import re
 from map_tools import MapTools
 from abc import ABC, abstractmethod
-from openpyxl import load_workbook, Workbook
-from model import Cell, Advice, Fact, Direction
 
 class AdviceStrategy(ABC):
 
-    def __init__(self, size, seed):
+    def __init__(self, size, seed, advice=None):
         self._size = size
         self._seed = seed
         
         self._MAPS_PATH = './02-maps'
-        self._facts = self.parse_map()
-        self._advice = self.generate_advice_from_facts()
+        if advice is None:
+            self._map = self.parse_map()
+            advice = self.generate_advice_from_facts()
+        self._advice = advice
     
     def generate_advice_from_facts(self):
-        goal_advice = []
-        hole_advice = []
-        frozen_advice = []
+        holes = self._map == 'H'
         
-        for fact in self._facts:
-            if(fact.value == 'G'):
-                goal_advice.append(Advice(fact.cell, 2))
-            elif(fact.value == 'H'):
-                hole_advice.append(Advice(fact.cell, -2))
-            else: #F or S
-                neighboring_holes = len([f for c in [n for n in fact.cell.get_neighbors() if n is not None] for f in self._facts if f.cell.row == c[0] and f.cell.col == c[1] and f.value=='H'])
-                if(neighboring_holes == 0):
-                    frozen_advice.append(Advice(fact.cell, 1))
-                elif(neighboring_holes == 1):
-                    frozen_advice.append(Advice(fact.cell, 0))
-                else:
-                    frozen_advice.append(Advice(fact.cell, -1))
+        # count the holes among the four neighbors of every cell by summing shifted copies of the padded grid
+        padded = np.pad(holes, 1).astype(int)
+        neighboring_holes = padded[:-2, 1:-1] + padded[2:, 1:-1] + padded[1:-1, :-2] + padded[1:-1, 2:]
         
-        return {'goal': goal_advice, 'holes': hole_advice, 'frozen': frozen_advice}
+        values = np.select([self._map == 'G', holes, neighboring_holes == 0, neighboring_holes == 1], [2, -2, 1, 0], -1)
+        
+        advice = {}
+        for kind, mask in [('goal', self._map == 'G'), ('holes', holes), ('frozen', ~np.isin(self._map, ['G', 'H']))]:
+            rows, cols = np.nonzero(mask)
+            advice[kind] = (rows, cols, values[rows, cols])
+        
+        return advice
+    
+    def get_all_advice(self):
+        return tuple(np.concatenate(columns) for columns in zip(*self._advice.values()))
     
     @abstractmethod
     def select_advice(self):
         pass
 
     def parse_map(self):
-        print(f'parsing map lake-{self._size}x{self._size}-seed{self._seed}.xlsx')
-        file = os.path.abspath(f'{self._MAPS_PATH}/lake-{self._size}x{self._size}-seed{self._seed}.xlsx')
-        workbook = load_workbook(filename=file)
-        
-        sheet = workbook.active
-        first_row = sheet[1]
-        size = int(first_row[-1].value)+1
-        
-        facts = []
-        for rid in range(0, size):
-            row = sheet[rid+2]
-            for cid in range(0, size):
-                cell = Cell(rid, cid, self._size)
-                facts.append(Fact(cell, row[cid+1].value))
+        print(f'parsing map lake-{self._size}x{self._size}-seed{self._seed}')
+        map_desc = MapTools(self._MAPS_PATH).parse_map(self._size, self._seed)
         
-        return facts
+        return np.array([list(row) for row in map_desc])
     
     def save_advice_file(self, advice, strategy_name):
         results_folder = os.path.abspath(self._MAPS_PATH)
         if not os.path.exists(results_folder):
             os.makedirs(results_folder)
         
+        rows, cols, values = advice
         with open(f'{self._MAPS_PATH}/advice-{self._size}x{self._size}-seed{self._seed}-{strategy_name}.txt', 'w') as file:
             file.write(f'{self._size}')
-            for advice in advice:
-                advice_string = f'\n[{advice.cell.row},{advice.cell.col}], {advice.value:+}'
-                file.write(advice_string)
+            file.write(''.join(f'\n[{row},{col}], {value:+}' for row, col, value in zip(rows.tolist(), cols.tolist(), values.tolist())))
 
     
 class EveryCellStrategy(AdviceStrategy):
     
     def select_advice(self):
-        self.save_advice_file([v for k, vs in self._advice.items() for v in vs], str(self))
+        self.save_advice_file(self.get_all_advice(), str(self))
     
     def __str__(self):
         return 'all'    
@@ -81,11 +68,62 @@ class EveryCellStrategy(AdviceStrategy):
 class JustTheHolesStrategy(AdviceStrategy):
     
     def select_advice(self):
-        self.save_advice_file(self._advice['goal']+self._advice['holes'], str(self))
+        self.save_advice_file(tuple(np.concatenate(columns) for columns in zip(self._advice['goal'], self._advice['holes'])), str(self))
         
     def __str__(self):
         return 'holes'
 
+"""
+Advice on a random sample of the cells, covering the given percentage of the map (like the human
+quotas human10 and human5, but drawn from the generated advice). The sample is seeded with the map seed.
+"""
+class SampledStrategy(AdviceStrategy):
+    
+    def __init__(self, size, seed, percent, advice=None):
+        super().__init__(size, seed, advice)
+        self._percent = percent
+    
+    def select_advice(self):
+        rows, cols, values = self.get_all_advice()
+        quota = int(round(len(values) * self._percent / 100))
+        
+        rng = np.random.default_rng([self._seed, self._percent])
+        selected = np.sort(rng.choice(len(values), size=quota, replace=False))
+        self.save_advice_file((rows[selected], cols[selected], values[selected]), str(self))
+    
+    def __str__(self):
+        return f'sample{self._percent}'
+
+
+def create_strategy(strategy_name, size, seed, advice=None):
+    if strategy_name == 'all':
+        return EveryCellStrategy(size, seed, advice)
+    elif strategy_name == 'holes':
+        return JustTheHolesStrategy(size, seed, advice)
+    
+    match = re.fullmatch(r'sample(\d+)', strategy_name)
+    if match is None:
+        raise Exception(f'Invalid advice strategy {strategy_name}')
+    
+    return SampledStrategy(size, seed, int(match.group(1)), advice)
+
+'''
+Generates the advice files of every strategy for every combination of sizes and seeds. Each map is parsed,
+and its advice computed, only once for all strategies.
+'''
+def generate_advice_files(sizes, seeds, strategy_names):
+    for strategy_name in strategy_names:
+        if not re.fullmatch(r'all|holes|sample\d+', strategy_name):
+            raise Exception(f'Invalid advice strategy {strategy_name}')
+    
+    for size in sizes:
+        for seed in seeds:
+            advice = None
+            for strategy_name in strategy_names:
+                strategy = create_strategy(strategy_name, size, seed, advice)
+                strategy.select_advice()
+                advice = strategy._advice
+
 
 #move advice_parser here
         
@@ -93,20 +131,17 @@ class JustTheHolesStrategy(AdviceStrategy):
 
 if __name__ == '__main__':
     parser = argparse.ArgumentParser()
-    parser.add_argument('-g', '--generate', required=True, choices=['all', 'holes'])
-    parser.add_argument('--size', required=True, type=int)
-    parser.add_argument('--seed', required=True, type=int)
+    parser.add_argument('-g', '--generate', required=True, nargs='+', help='Advice strategies: all, holes, sample<percent>')
+    parser.add_argument('--size', type=int)
+    parser.add_argument('--seed', type=int)
+    parser.add_argument('--sizes', type=int, nargs='+')
+    parser.add_argument('--seeds', type=int, nargs='+')
 
     options = parser.parse_args()
     
-    assert options.size
-    assert options.seed
-    size = int(options.size)
-    seed = int(options.seed)
-    
-    if(options.generate == 'all'):
-        EveryCellStrategy(size, seed).select_advice()
-    elif(options.generate == 'holes'):
-        JustTheHolesStrategy(size, seed).select_advice()
-    else:
-        raise Error('Invalid argument')
\ No newline at end of file
+    sizes = options.sizes if options.sizes else [options.size]
+    seeds = options.seeds if options.seeds else [options.seed]
+    if None in sizes or None in seeds:
+        parser.error('either --size and --seed, or --sizes and --seeds are required')
+    
+    generate_advice_files(sizes, seeds, options.generate)
@@ -1,14 +1,17 @@
-import matplotlib.pyplot as plt
+import matplotlib
+matplotlib.use('Agg') # figures are only written to files, also from worker processes
 import matplotlib.colors as mcolors
-import pandas as pd
+from matplotlib.figure import Figure
 import seaborn as sns
 import numpy as np
 from enum import Enum
 from map_tools import MapTools
+from results_index import ResultIndex
 import argparse
 import os
 import shutil
 import logging
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
 
 episodes = [10000]
@@ -20,6 +23,13 @@ filename = f'{size}x{size}-seed{seed}'
 inputFolder = f'./experiments/{name}'
 resultsPath = './06-analysis-output'
 experiments_input_path = './03-input'
+workers = 8
+render_workers = os.cpu_count()
+downsampling = 'lttb'
+downsampling_points = 1000
+confidence_bands = True
+use_cache = True
+result_index = None
 
 
 class DataKind(Enum):
@@ -36,45 +46,130 @@ class ExperimentKind(Enum):
     COOPERATIVE_10 = 'coop10'
 
 
-def loadSyntheticData(experiment_kind, episode_number, data_kind):
-    df_advice_00 = pd.read_csv(f'{inputFolder}/{episode_number}/{data_kind.value}_data/advice-synthetic-{experiment_kind}/{filename}-u-0.01.csv', header=None)
-    df_advice_02 = pd.read_csv(f'{inputFolder}/{episode_number}/{data_kind.value}_data/advice-synthetic-{experiment_kind}/{filename}-u-0.2.csv', header=None)
-    df_advice_04 = pd.read_csv(f'{inputFolder}/{episode_number}/{data_kind.value}_data/advice-synthetic-{experiment_kind}/{filename}-u-0.4.csv', header=None)
-    df_advice_06 = pd.read_csv(f'{inputFolder}/{episode_number}/{data_kind.value}_data/advice-synthetic-{experiment_kind}/{filename}-u-0.6.csv', header=None)
-    df_advice_08 = pd.read_csv(f'{inputFolder}/{episode_number}/{data_kind.value}_data/advice-synthetic-{experiment_kind}/{filename}-u-0.8.csv', header=None)
-    #df_advice_10 = pd.read_csv(f'{inputFolder}/{episode_number}/{data_kind.value}_data/advice/{filename}-u-1.0.csv', header=None),
-    df_no_advice = pd.read_csv(f'{inputFolder}/{episode_number}/{data_kind.value}_data/noadvice/{filename}.csv', header=None)
-    df_random = pd.read_csv(f'{inputFolder}/{episode_number}/{data_kind.value}_data/random/{filename}.csv', header=None)
+def get_result_index():
+    # every result file of the experiment is parsed at most once, however many analyses use it
+    global result_index
+    if result_index is None:
+        result_index = ResultIndex(inputFolder, workers=workers, cache=use_cache)
     
-    return {
-        'advice_00': df_advice_00,
-        'advice_02': df_advice_02,
-        'advice_04': df_advice_04,
-        'advice_06': df_advice_06,
-        'advice_08': df_advice_08,
-        #'advice_10': df_advice_10
-        'no_advice': df_no_advice,
-        'random': df_random
-    }
+    return result_index
+
+
+def loadSummaries(entries):
+    # mean, std, ci_low, ci_high and quantiles of every column, as saved by the runner when a result was completed
+    return dict(zip(entries, get_result_index().load_summaries(list(entries.values()))))
+
 
+def getSyntheticEntries(experiment_kind, episode_number, data_kind):
+    index = get_result_index()
+    
+    # every level of u found for the map, e.g. {filename}-u-0.01 as advice_u0.01 and {filename}-u-0.2 as advice_u0.2
+    advice_entries = [entry for entry in index.find(episode_number, data_kind.value, f'advice-synthetic-{experiment_kind}')
+        if entry.name.startswith(f'{filename}-') and entry.get_parameter(filename, 'u') is not None]
+    advice_entries.sort(key=lambda entry: entry.get_parameter(filename, 'u'))
+    
+    entries = {f'advice_u{entry.get_parameter(filename, "u"):g}': entry for entry in advice_entries}
+    entries['no_advice'] = index.find_one(episode_number, data_kind.value, 'noadvice', filename)
+    entries['random'] = index.find_one(episode_number, data_kind.value, 'random', filename)
+    
+    return entries
 
-def loadCoopData(experiment_kind, episode_number, data_kind):
-    df_advice_coop_sequential = pd.read_csv(f'{inputFolder}/{episode_number}/{data_kind.value}_data/advice-{experiment_kind}-topleft-bottomright/{filename}.csv', header=None)
-    df_advice_coop_parallel = pd.read_csv(f'{inputFolder}/{episode_number}/{data_kind.value}_data/advice-{experiment_kind}-topright-bottomleft/{filename}.csv', header=None)
-    df_no_advice = pd.read_csv(f'{inputFolder}/{episode_number}/{data_kind.value}_data/noadvice/{filename}.csv', header=None)
-    df_random = pd.read_csv(f'{inputFolder}/{episode_number}/{data_kind.value}_data/random/{filename}.csv', header=None)
+
+def getCoopEntries(experiment_kind, episode_number, data_kind):
+    index = get_result_index()
     
     return {
-        'coop_sequential': df_advice_coop_sequential,
-        'coop_parallel': df_advice_coop_parallel,
-        'no_advice': df_no_advice,
-        'random': df_random
+        'coop_sequential': index.find_one(episode_number, data_kind.value, f'advice-{experiment_kind}-topleft-bottomright', filename),
+        'coop_parallel': index.find_one(episode_number, data_kind.value, f'advice-{experiment_kind}-topright-bottomleft', filename),
+        'no_advice': index.find_one(episode_number, data_kind.value, 'noadvice', filename),
+        'random': index.find_one(episode_number, data_kind.value, 'random', filename)
     }
 
 
-def savefig(plot_name):
-    plt.gcf().tight_layout()
-    plt.savefig(f'{resultsPath}/{plot_name}.pdf', bbox_inches='tight', pad_inches=0.01)
+def getEntries(experiment_kind, episode_number, data_kind):
+    if experiment_kind in ['all', 'holes', 'human5', 'human10']:
+        return getSyntheticEntries(experiment_kind, episode_number, data_kind)
+    
+    return getCoopEntries(experiment_kind, episode_number, data_kind)
+
+
+def get_legend_label(df_name):
+    if df_name.startswith('advice_u'):
+        return f'Advice@u={df_name[len("advice_u"):]}'
+    
+    return {'coop_sequential': 'Coop - Sequential', 'coop_parallel': 'Coop - Parallel', 'no_advice': 'No advice', 'random': 'Random'}.get(df_name, df_name)
+
+
+CURVE_STYLES = {
+    'coop_sequential': {'color': 'tomato'},
+    'coop_parallel': {'color': 'lightseagreen'},
+    'advice_u0.01': {'color': 'orange'},
+    'advice_u0.2': {'color': 'yellowgreen'},
+    'advice_u0.4': {'color': 'dodgerblue'},
+    'advice_u0.6': {'color': 'darkviolet'},
+    'advice_u0.8': {'color': 'hotpink'},
+    'no_advice': {'color': 'black', 'linestyle': 'dashed'},
+    'random': {'color': 'black', 'linestyle': 'dotted'}
+}
+
+
+def savefig(fig, plot_name):
+    fig.tight_layout()
+    fig.savefig(f'{resultsPath}/{plot_name}.pdf', bbox_inches='tight', pad_inches=0.01)
+
+
+def downsample_lttb(x, y, points):
+    '''
+    Largest-Triangle-Three-Buckets: keeps the first and last point, and from each of points-2 buckets in between the point
+    spanning the largest triangle with the point kept before it and the mean of the next bucket
+    '''
+    if points < 3 or len(y) <= points:
+        return x, y
+    
+    edges = np.linspace(1, len(y)-1, points-1).astype(int)
+    selected = np.zeros(points, dtype=int)
+    selected[-1] = len(y)-1
+    for bucket in range(points-2):
+        start, end = edges[bucket], edges[bucket+1]
+        next_end = edges[bucket+2] if bucket+2 < len(edges) else len(y)
+        next_x, next_y = x[end:next_end].mean(), y[end:next_end].mean()
+        
+        previous = selected[bucket]
+        areas = np.abs((x[previous] - next_x) * (y[start:end] - y[previous]) - (x[previous] - x[start:end]) * (next_y - y[previous]))
+        selected[bucket+1] = start + areas.argmax()
+    
+    return x[selected], y[selected]
+
+
+def downsample_minmax(x, y, points):
+    '''
+    Keeps the first and last point, and the minimum and maximum of each of points/2 buckets
+    '''
+    if points < 4 or len(y) <= points:
+        return x, y
+    
+    buckets = points // 2
+    bucket_size = -(-len(y) // buckets)
+    padded = np.full(buckets * bucket_size, np.nan)
+    padded[:len(y)] = y
+    padded = padded.reshape(buckets, bucket_size)
+    
+    offsets = np.arange(buckets) * bucket_size
+    buckets_with_points = offsets < len(y)
+    minima = offsets + np.nanargmin(np.where(buckets_with_points[:, np.newaxis], padded, 0), axis=1)
+    maxima = offsets + np.nanargmax(np.where(buckets_with_points[:, np.newaxis], padded, 0), axis=1)
+    selected = np.unique(np.concatenate([[0, len(y)-1], minima[buckets_with_points], maxima[buckets_with_points]]))
+    
+    return x[selected], y[selected]
+
+
+def downsample(x, y):
+    if downsampling == 'lttb':
+        return downsample_lttb(x, y, downsampling_points)
+    if downsampling == 'minmax':
+        return downsample_minmax(x, y, downsampling_points)
+    
+    return x, y
 
 
 def print_rewards():
@@ -83,16 +178,10 @@ def print_rewards():
         
         print(experiment_kind)
         for episode_number in episodes:
-
-            if experiment_kind in ['all', 'holes', 'human5', 'human10']:
-                dfs = loadSyntheticData(experiment_kind, episode_number, DataKind.REWARD)
-
-            else:
-                dfs = loadCoopData(experiment_kind, episode_number, DataKind.REWARD)
+            summaries = loadSummaries(getEntries(experiment_kind, episode_number, DataKind.REWARD))
             
-            for df_name, df in dfs.items():
-                mean = df.mean()
-                print(f'{df_name} mean: {round(mean.iloc[-1], 3)}')
+            for df_name, summary in summaries.items():
+                print(f'{df_name} mean: {round(summary["mean"][-1], 3)} ({summary["confidence"]:.0%} CI {summary["ci_low"][-1]:.3f}-{summary["ci_high"][-1]:.3f})')
             
             print('')
 
@@ -101,6 +190,7 @@ def cumulative_reward():
     folder_name = f'cumulative_reward-{name}-{datetime.now().strftime("%Y%m%d-%H%M%S")}'
     os.mkdir(f'{resultsPath}/{folder_name}')
     
+    jobs = []
     for experiment_kind in ExperimentKind:
         experiment_kind = experiment_kind.value
         
@@ -111,77 +201,115 @@ def cumulative_reward():
         for episode_number in episodes:
             logging.info(f'Running analysis cumulative_reward with episode_number {episode_number}')
             
-            if experiment_kind in ['all', 'holes', 'human5', 'human10']:
-                dfs = loadSyntheticData(experiment_kind, episode_number, DataKind.REWARD)
-
-            else:
-                dfs = loadCoopData(experiment_kind, episode_number, DataKind.REWARD)
+            summaries = loadSummaries(getEntries(experiment_kind, episode_number, DataKind.REWARD))
             
-            fig = plt.figure()
-            ax = plt.gca()
+            # the mean curves are downsampled before they are sent to the worker processes, the bands at the same episodes
+            curves = []
+            for df_name, summary in summaries.items():
+                x, mean = downsample(np.arange(len(summary['mean'])), summary['mean'])
+                band = (summary['ci_low'][x], summary['ci_high'][x]) if confidence_bands else None
+                curves.append((df_name, x, mean, band))
             
-            for df_name, df in dfs.items():
-
-                mean = df.mean()
-                x = np.arange(len(mean))
-                if df_name == 'coop_sequential':
-                    plt.plot(x, mean, label=df_name, color='tomato')
-                elif df_name == 'coop_parallel':
-                    plt.plot(x, mean, label=df_name, color='lightseagreen')
-                elif df_name == 'advice_00':
-                    plt.plot(x, mean, label=df_name, color='orange')
-                elif df_name == 'advice_02':
-                    plt.plot(x, mean, label=df_name, color='yellowgreen')
-                elif df_name == 'advice_04':
-                    plt.plot(x, mean, label=df_name, color='dodgerblue')
-                elif df_name == 'advice_06':
-                    plt.plot(x, mean, label=df_name, color='darkviolet')
-                elif df_name == 'advice_08':
-                    plt.plot(x, mean, label=df_name, color='hotpink')
-                elif df_name == 'no_advice':
-                    plt.plot(x, mean, label=df_name, color='black', linestyle='dashed')
-                elif df_name == 'random':
-                    plt.plot(x, mean, label=df_name, color='black', linestyle='dotted')
-                else:
-                    plt.plot(x, mean, label=df_name)
-                # Used to plot standard deviation
-                #if df_name=='no_advice':
-                #    std = df.std()
-                #    plt.fill_between(x, mean - std, mean + std, alpha=0.2)
-                #    maxvalue = df.max()
-                #    plt.plot(x, maxvalue, label='noadvice-max')
-                #    minvalue = df.min()
-                #    plt.plot(x, minvalue, label='noadvice-min')
+            # e.g. Advice@u=0.0 ... Advice@u=0.8, No advice, Random; or Coop - Sequential, Coop - Parallel, No advice, Random
+            legend_labels = [get_legend_label(df_name) for df_name in summaries]
             
-            plt.xlabel('Episode')
-            plt.ylabel('Cumulative Reward')
-            ax.set_ylim([0, 10000])
-
-            if experiment_kind in ['all', 'holes', 'human5', 'human10']:
-                #legend_labels = ['Random', 'No advice', 'No advice sigma', 'No advice max', 'No advice min', 'Advice@u=0.0', 'Advice@u=0.2', 'Advice@u=0.4', 'Advice@u=0.6', 'Advice@u=0.8']
-                legend_labels = ['Advice@u=0.0', 'Advice@u=0.2', 'Advice@u=0.4',
-                                 'Advice@u=0.6', 'Advice@u=0.8', 'No advice', 'Random']
-            else:
-                #legend_labels = ['Random', 'No advice', 'No advice sigma', 'No advice max', 'No advice min', 'Top Left Bottom Right', 'Top Right Bottom Left']
-                legend_labels = ['Coop - Sequential', 'Coop - Parallel', 'No advice', 'Random']
-
-            plt.legend(labels=legend_labels, fontsize='14', loc='upper left')
-            #plt.show()
-            
-            logging.info('\tSave linear plot')
-            savefig(f'{folder_name}/{experiment_kind}/cumulative_reward-{experiment_kind}-{episode_number}-linear')
-            
-            logging.info('\tSave log plot')
-            plt.legend(labels=legend_labels, fontsize='14', loc='lower right')
-            plt.yscale('log')
-            ax.autoscale()
-            savefig(f'{folder_name}/{experiment_kind}/cumulative_reward-{experiment_kind}-{episode_number}-log')
+            jobs.append((curves, legend_labels, f'{folder_name}/{experiment_kind}/cumulative_reward-{experiment_kind}-{episode_number}'))
+    
+    logging.info(f'\tSave {len(jobs)} linear and log plots')
+    render_batch(render_cumulative_reward, jobs)
+
+
+def render_cumulative_reward(job):
+    curves, legend_labels, plot_name = job
+    
+    fig = Figure()
+    ax = fig.subplots()
+    lines = []
+    for df_name, x, mean, band in curves:
+        lines += ax.plot(x, mean, label=df_name, **CURVE_STYLES.get(df_name, {}))
+        if band is not None:
+            ax.fill_between(x, *band, color=lines[-1].get_color(), alpha=0.2, linewidth=0)
+    
+    ax.set_xlabel('Episode')
+    ax.set_ylabel('Cumulative Reward')
+    ax.set_ylim([0, 10000])
+    ax.legend(handles=lines, labels=legend_labels, fontsize='14', loc='upper left')
+    savefig(fig, f'{plot_name}-linear')
+    
+    ax.legend(handles=lines, labels=legend_labels, fontsize='14', loc='lower right')
+    ax.set_yscale('log')
+    ax.autoscale()
+    savefig(fig, f'{plot_name}-log')
+
+
+HEATMAP_DIRECTIONS = np.array(['←', '↓', '→', '↑'])
+
+
+def get_heatmap_data(policies, map_description):
+    '''
+    Mean probability and direction of the most likely action of every cell, from the (repetitions, states*4) policy matrix of a
+    map of any size. Terminal cells and cells without a learned preference (uniform or zero probability) are left blank.
+    '''
+    size = len(map_description)
+    probabilities = np.asarray(policies, dtype=float).mean(axis=0).reshape(size*size, len(HEATMAP_DIRECTIONS))
+    best_actions = probabilities.argmax(axis=1)
+    best_probabilities = probabilities[np.arange(size*size), best_actions]
+    
+    terminals = np.isin(np.array([list(row) for row in map_description]).reshape(-1), ['H', 'G'])
+    shown = ~terminals & (best_probabilities != 0.25) & (best_probabilities != 0.0)
+    
+    values = np.where(shown, best_probabilities, np.nan).reshape(size, size)
+    annotations = np.where(shown, HEATMAP_DIRECTIONS[best_actions], '').reshape(size, size)
+    
+    return values, annotations
+
+
+def render_heatmap(job):
+    values, annotations, plot_name = job
+    
+    fig = Figure()
+    ax = fig.subplots()
+    sns.heatmap(
+        values,
+        linewidths=0.001,
+        linecolor='gray',
+        square=True,
+        annot=annotations,
+        fmt='',
+        cmap=sns.color_palette("Blues", as_cmap=True),
+        vmin=0.0,
+        vmax=1.0,
+        xticklabels=[],
+        yticklabels=[],
+        annot_kws={"fontsize": "x-large"},
+        ax=ax
+    )
+    ax.axis('off')
+    ax.set_xlabel('')
+    ax.set_ylabel('')
+    savefig(fig, plot_name)
+
+
+def render_batch(render, jobs):
+    # figures are independent of each other, so they are rendered on a pool of worker processes
+    if render_workers <= 1 or len(jobs) <= 1:
+        for job in jobs:
+            render(job)
+        return
+    
+    with ProcessPoolExecutor(max_workers=min(render_workers, len(jobs))) as pool:
+        for _ in pool.map(render, jobs):
+            pass
 
 
 def heatmap():
     folder_name = 'heatmaps'
     os.mkdir(f'{resultsPath}/{folder_name}')
     
+    map_description = MapTools(experiments_input_path).parse_map(size, seed)
+    logging.debug(map_description)
+    
+    jobs = []
     for experiment_kind in ExperimentKind:
         experiment_kind = experiment_kind.value
         
@@ -192,101 +320,29 @@ def heatmap():
         for episode_number in episodes:
             logging.info(f'Running analysis heatmap with episode_number {episode_number}')
             
-            if experiment_kind in ['all', 'holes', 'human5', 'human10']:
-                dfs = loadSyntheticData(experiment_kind, episode_number, DataKind.POLICY)
-
-            else:
-                dfs = loadCoopData(experiment_kind, episode_number, DataKind.POLICY)
+            summaries = loadSummaries(getEntries(experiment_kind, episode_number, DataKind.POLICY))
             
-            #logging.debug(dfs['advice_00'])
-            
-            for advice_type, data_frame in dfs.items():
-                print(advice_type)
-            
-                #df = dfs['advice_00'].mean().to_frame() # TODO: should process every dataframe (rand, unadvised, and every advised (every level of u))
-                df = data_frame.mean().to_frame()
-                
-                jss = []
-                for i in range(0, 144):
-                    jss.append([i, i, i, i])
-                cellids = [j for js in jss for j in js]
-                
-                df.insert(0, 'cellid', cellids)
-                df.columns.values[1] = 'prob'
-                
-                dss = []
-                for d in range(0, 144):
-                    dss.append(['←', '↓', '→', '↑'])
-                    #dss.append(['L', 'D', 'R', 'U'])
-                directions = [d for ds in dss for d in ds]
-                
-                df['direction'] = directions
-                
-                logging.debug(df)
-                
-                df = df.sort_values('prob', ascending=False).drop_duplicates(['cellid'])
-                df = df.sort_values('cellid', ascending=True).reset_index(drop=True)
-                #df = df.drop(['cellid'], axis=1)
-                
-                size = 12
-                seed = 63
+            for advice_type, summary in summaries.items():
+                values, annotations = get_heatmap_data(summary['mean'][np.newaxis], map_description)
+                logging.debug(values)
+                logging.debug(annotations)
                 
-                df = df.assign(row = lambda x: (x['cellid'] // 12))
-                df = df.assign(col = lambda x: (x['cellid'] % 12))
-                
-                map_description = MapTools(experiments_input_path).parse_map(size, seed)
-                logging.debug(map_description)
-                
-                terminals = []
-                for rid, row in enumerate(map_description):
-                    for cell in range(0, len(row)):
-                        #logging.debug(row[cell])
-                        if row[cell] in ('H', 'G'):
-                            terminals.append(size*rid+cell)
-                            
-                for t in terminals:
-                    df.loc[t, 'prob'] = 0.0
-                    df.loc[t, 'direction'] = ''
-                    
-                df = df.loc[df['prob'] !=0.25]
-                df = df.loc[df['prob'] !=0.0]
-                
-                logging.debug(df)
-                
-                result = df.pivot(index='row', columns='col', values='prob')
-                logging.debug(result)
-                
-                directions = df.pivot(index='row', columns='col', values='direction')
-                logging.debug(directions)
-                
-                plt.clf()
-                
-                ax = sns.heatmap(
-                    result,
-                    linewidths=0.001,
-                    linecolor='gray',
-                    square=True,
-                    annot=directions,
-                    fmt='',
-                    cmap=sns.color_palette("Blues", as_cmap=True),
-                    vmin=0.0,
-                    vmax=1.0,
-                    xticklabels=[],
-                    yticklabels=[],
-                    annot_kws={"fontsize": "x-large"}
-                )
-                ax.axis('off')
-                plt.xlabel('')
-                plt.ylabel('')
-                #plt.show()
-                logging.info('\tSave heatmap')
-                savefig(f'{folder_name}/{experiment_kind}/heatmap-{experiment_kind}-{advice_type}-{episode_number}')
+                jobs.append((values, annotations, f'{folder_name}/{experiment_kind}/heatmap-{experiment_kind}-{advice_type}-{episode_number}'))
+    
+    logging.info(f'\tSave {len(jobs)} heatmaps')
+    render_batch(render_heatmap, jobs)
                 
 
 if __name__ == '__main__':
     parser = argparse.ArgumentParser()
     parser.add_argument('-a', type=str)
     parser.add_argument('-s','--stash', help='Stash results folder.', )
+    parser.add_argument('-w', '--workers', type=int, default=8, help='Number of threads loading result files.')
+    parser.add_argument('-p', '--processes', type=int, default=os.cpu_count(), help='Number of worker processes rendering figures.')
+    parser.add_argument('--downsampling', default='lttb', choices=['lttb', 'minmax', 'none'], help='Downsampling of the curves of line plots.')
+    parser.add_argument('--points', type=int, default=1000, help='Number of points of every downsampled curve.')
+    parser.add_argument('--no-bands', action='store_true', help='Do not draw the confidence interval of the mean around the curves of line plots.')
+    parser.add_argument('--no-cache', action='store_true', help='Do not keep parsed CSV results in the .analysis-cache folder of the experiment.')
     
     parser.add_argument(
         "-log",
@@ -310,6 +366,13 @@ if __name__ == '__main__':
     
     logging.basicConfig(format='[%(levelname)s] %(message)s')
     logging.getLogger().setLevel(level)
+    
+    workers = options.workers
+    render_workers = options.processes
+    downsampling = options.downsampling
+    downsampling_points = options.points
+    confidence_bands = not options.no_bands
+    use_cache = not options.no_cache
         
     if options.stash:
         logging.info('Previous analysis output folder will be stashed.')
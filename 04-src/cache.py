@@ -0,0 +1,82 @@
+import hashlib
+import json
+import logging
+import numpy as np
+import os
+
+'''
+SHA-256 of the content of arrays and JSON-serializable values
+'''
+def get_content_key(*parts):
+    digest = hashlib.sha256()
+    for part in parts:
+        if isinstance(part, np.ndarray):
+            digest.update(f'{part.dtype.str}{part.shape}'.encode())
+            digest.update(np.ascontiguousarray(part).tobytes())
+        else:
+            digest.update(json.dumps(part, sort_keys=True, default=str).encode())
+
+    return digest.hexdigest()
+
+"""
+Content-addressed cache of experiment results.
+
+Every entry is one .npz file named after the hash of everything that determines a result (map, advice,
+hyperparameters, episode budget, seed). Entries are looked up before training and survive across
+experiment names; the least recently used entries are evicted once the cache outgrows its size limit.
+"""
+class ResultCache():
+
+    def __init__(self, folder, max_size_mb=2048):
+        self._FOLDER = folder
+        self._MAX_SIZE = max_size_mb * 1024 * 1024
+
+        cache_folder = os.path.abspath(self._FOLDER)
+        if not os.path.exists(cache_folder):
+            os.makedirs(cache_folder)
+
+    def get_key(self, *parts):
+        return get_content_key(*parts)
+
+    def get_file_name(self, key):
+        return os.path.join(self._FOLDER, f'{key}.npz')
+
+    def load(self, key):
+        file_name = self.get_file_name(key)
+        if not os.path.exists(file_name):
+            return None
+
+        try:
+            with np.load(file_name) as entry:
+                result = tuple(entry[f'arr_{i}'] for i in range(len(entry.files)))
+        except (OSError, ValueError, EOFError):
+            logging.warning(f'Ignoring unreadable cache entry {file_name}')
+            return None
+
+        # the modification time marks the last use of an entry
+        os.utime(file_name)
+        logging.debug(f'Cache hit {key}')
+
+        return tuple(value[()] if value.ndim == 0 else value for value in result)
+
+    def save(self, key, result):
+        file_name = self.get_file_name(key)
+        temporary_file_name = f'{file_name}.{os.getpid()}.tmp'
+        with open(temporary_file_name, 'wb') as file:
+            np.savez(file, *[np.asarray(value) for value in result])
+        os.replace(temporary_file_name, file_name)
+
+    def evict(self):
+        entries = []
+        for file in os.listdir(self._FOLDER):
+            if file.endswith('.npz'):
+                stat = os.stat(os.path.join(self._FOLDER, file))
+                entries.append((stat.st_mtime, stat.st_size, file))
+
+        total_size = sum(size for _, size, _ in entries)
+        for _, size, file in sorted(entries):
+            if total_size <= self._MAX_SIZE:
+                break
+            os.remove(os.path.join(self._FOLDER, file))
+            total_size -= size
+            logging.debug(f'Evicted cache entry {file}')
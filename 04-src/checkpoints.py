@@ -0,0 +1,49 @@
+import json
+import logging
+import numpy as np
+import os
+
+"""
+Training state of a job after a number of episodes: the arrays of the trainer (numerical preferences, rewards and episode
+lengths so far, convergence), and the state of its random generator.
+
+Checkpoints are compressed .npz files tagged with the key of the training they belong to (everything that determines the
+training except the episode budget), so that a job can continue from a checkpoint after an interruption or with a larger
+budget, and yield exactly the results of an uninterrupted run.
+"""
+class Checkpoint():
+
+    def __init__(self, key, episodes, rng_state, arrays):
+        self.key = key
+        self.episodes = episodes
+        self.rng_state = rng_state
+        self.arrays = arrays
+
+    def save(self, file_name):
+        folder = os.path.dirname(os.path.abspath(file_name))
+        if not os.path.exists(folder):
+            os.makedirs(folder)
+
+        temporary_file_name = f'{file_name}.{os.getpid()}.tmp'
+        with open(temporary_file_name, 'wb') as file:
+            np.savez_compressed(file, key=np.array(self.key), episodes=np.array(self.episodes), rng_state=np.array(json.dumps(self.rng_state)), **self.arrays)
+        os.replace(temporary_file_name, file_name)
+
+    @classmethod
+    def load(cls, file_name, key=None):
+        if not os.path.exists(file_name):
+            return None
+
+        try:
+            with np.load(file_name) as checkpoint:
+                arrays = {name: checkpoint[name] for name in checkpoint.files if name not in ['key', 'episodes', 'rng_state']}
+                checkpoint = cls(str(checkpoint['key']), int(checkpoint['episodes']), json.loads(str(checkpoint['rng_state'])), arrays)
+        except (OSError, ValueError, EOFError, KeyError):
+            logging.warning(f'Ignoring unreadable checkpoint {file_name}')
+            return None
+
+        if key is not None and checkpoint.key != key:
+            logging.warning(f'Ignoring checkpoint {file_name} of a different training')
+            return None
+
+        return checkpoint
@@ -0,0 +1,100 @@
+import numpy as np
+
+"""
+FrozenLake environment backed by precomputed NumPy transition tables.
+
+Mirrors the dynamics of gym's FrozenLake-v1 (including its TimeLimit wrapper) without the gym
+wrappers and environment checkers. Every transition is stored as a dense (states, actions, outcomes)
+table: a single outcome on non-slippery maps, and the three outcomes (a-1, a, a+1) with probability
+1/3 each on slippery maps. Random numbers are drawn in the same order as gym, so the same seed and
+the same actions yield the same trajectory.
+"""
+class FrozenLake():
+
+    def __init__(self, map_desc, is_slippery=False, max_episode_steps=100, seed=None):
+        self.desc = np.asarray([list(row) for row in map_desc])
+        self.num_rows, self.num_cols = self.desc.shape
+        self.num_states = self.num_rows * self.num_cols
+        self.num_actions = 4
+        self.is_slippery = is_slippery
+        self.max_episode_steps = max_episode_steps
+
+        letters = self.desc.reshape(-1)
+        self.initial_state_distribution = (letters == 'S').astype(float)
+        self.initial_state_distribution /= self.initial_state_distribution.sum()
+        self.start_state = int(np.argmax(self.initial_state_distribution))
+
+        self.build_transition_table()
+
+        self.np_random = np.random.default_rng(seed)
+        self.state = self.start_state
+        self.elapsed_steps = 0
+
+    def build_transition_table(self):
+        letters = self.desc.reshape(-1)
+        rows, cols = np.divmod(np.arange(self.num_states), self.num_cols)
+
+        # columns follow the action encoding of FrozenLake: LEFT, DOWN, RIGHT, UP
+        next_rows = np.stack([rows, np.minimum(rows+1, self.num_rows-1), rows, np.maximum(rows-1, 0)], axis=1)
+        next_cols = np.stack([np.maximum(cols-1, 0), cols, np.minimum(cols+1, self.num_cols-1), cols], axis=1)
+        moves = next_rows*self.num_cols + next_cols
+
+        actions = np.arange(self.num_actions)
+        if self.is_slippery:
+            outcomes = np.stack([(actions-1) % self.num_actions, actions, (actions+1) % self.num_actions], axis=1)
+        else:
+            outcomes = actions[:, np.newaxis]
+        num_outcomes = outcomes.shape[1]
+
+        next_states = moves[:, outcomes]
+        next_letters = letters[next_states]
+
+        self.next_states = next_states
+        self.rewards = (next_letters == 'G').astype(float)
+        self.terminals = np.isin(next_letters, ['G', 'H'])
+        self.transition_probs = np.full((self.num_states, self.num_actions, num_outcomes), 1/num_outcomes)
+
+        # holes and the goal are absorbing: a single outcome that stays in place
+        absorbing = np.isin(letters, ['G', 'H'])
+        self.next_states[absorbing] = np.flatnonzero(absorbing)[:, np.newaxis, np.newaxis]
+        self.rewards[absorbing] = 0.0
+        self.terminals[absorbing] = True
+        self.transition_probs[absorbing] = 0.0
+        self.transition_probs[absorbing, :, 0] = 1.0
+
+        self.transition_cdf = np.cumsum(self.transition_probs, axis=2)
+
+    def categorical_sample(self, cdf):
+        return int(np.argmax(cdf > self.np_random.random()))
+
+    def reset(self, seed=None):
+        if seed is not None:
+            self.np_random = np.random.default_rng(seed)
+        self.state = self.categorical_sample(np.cumsum(self.initial_state_distribution))
+        self.elapsed_steps = 0
+
+        return self.state, {'prob': 1}
+
+    def step(self, action):
+        outcome = self.categorical_sample(self.transition_cdf[self.state, action])
+        probability = self.transition_probs[self.state, action, outcome]
+        reward = self.rewards[self.state, action, outcome]
+        terminated = bool(self.terminals[self.state, action, outcome])
+        self.state = int(self.next_states[self.state, action, outcome])
+
+        self.elapsed_steps += 1
+        truncated = self.elapsed_steps >= self.max_episode_steps
+
+        return self.state, reward, terminated, truncated, {'prob': probability}
+
+    def step_batch(self, states, actions, samples=None):
+        """
+        Transition many agents at once. `samples` are uniform random numbers in [0, 1) that select
+        the outcome on slippery maps (one per agent), in the same way as categorical_sample.
+        """
+        if not self.is_slippery:
+            return self.next_states[states, actions, 0], self.rewards[states, actions, 0], self.terminals[states, actions, 0]
+
+        outcomes = np.argmax(self.transition_cdf[states, actions] > samples[:, np.newaxis], axis=1)
+
+        return self.next_states[states, actions, outcomes], self.rewards[states, actions, outcomes], self.terminals[states, actions, outcomes]
@@ -1,7 +1,8 @@
 import argparse
-import gym
 import imageio
+import json
 import logging
+import numpy as np
 import os
 import pandas as pd
 import random
@@ -77,12 +78,119 @@ class MapTools():
     def get_file_name(self, size, seed):
         return f'lake-{size}x{size}-seed{seed}'
 
-    def generate_map(self, size, seed):
+    def generate_map(self, size, seed, xlsx=False):
         folder = os.path.abspath(self._FILES_PATH)
         if not os.path.exists(folder):
             os.makedirs(folder)
-            
-        file = os.path.abspath(f'{self._FILES_PATH}/{self.get_file_name(size, seed)}.xlsx')
+        
+        map_desc = [['F' for col in range(size)] for row in range(size)]
+        map_desc[0][0] = 'S'
+        map_desc[size-1][size-1] = 'G'
+        
+        holes = self.randomize_holes(size=size, seed=seed)
+        for hole in holes:
+            (row, col) = self.sequence_to_coordinates(hole, size)
+            map_desc[row][col] = 'H'
+        
+        map_desc = [''.join(row) for row in map_desc]
+        if not self.is_solvable(map_desc):
+            logging.warning(f'There is no path from start to goal in {self.get_file_name(size, seed)}')
+        self.save_map(map_desc, size, seed)
+        if xlsx:
+            self.export_xlsx(size, seed)
+    
+    def randomize_hole_masks(self, size, rngs, frozen_tiles_ratio=0.8):
+        # start and goal take two cells of the hole quota, smaller maps would get a negative number of holes
+        if size < 3:
+            raise ValueError(f'Maps must be at least 3x3, got {size}x{size}')
+        num_holes = round(size*size*(1-frozen_tiles_ratio))-2
+        
+        # a random permutation of the cells between start and goal for every map; the first cells become holes
+        keys = np.stack([rng.random(size*size-2) for rng in rngs])
+        hole_cells = np.argsort(keys, axis=1)[:, :num_holes] + 1
+        
+        holes = np.zeros((len(rngs), size*size), dtype=bool)
+        np.put_along_axis(holes, hole_cells, True, axis=1)
+        
+        return holes.reshape(len(rngs), size, size)
+    
+    def get_reachable_cells(self, holes):
+        '''
+        Flood fill from the start cell of every map in a (maps, size, size) batch of hole masks
+        '''
+        reachable = np.zeros_like(holes)
+        reachable[:, 0, 0] = True
+        while True:
+            grown = reachable.copy()
+            grown[:, 1:, :] |= reachable[:, :-1, :]
+            grown[:, :-1, :] |= reachable[:, 1:, :]
+            grown[:, :, 1:] |= reachable[:, :, :-1]
+            grown[:, :, :-1] |= reachable[:, :, 1:]
+            grown &= ~holes
+            if np.array_equal(grown, reachable):
+                return reachable
+            reachable = grown
+    
+    def is_solvable(self, map_desc):
+        holes = np.array([list(row) for row in map_desc]) == 'H'
+        
+        return bool(self.get_reachable_cells(holes[np.newaxis])[0, -1, -1])
+    
+    def generate_map_arrays(self, size, seeds, frozen_tiles_ratio=0.8, max_attempts=1000):
+        '''
+        Generates one solvable map per seed as a (maps, size, size) array of S/F/H/G letters.
+        Unsolvable maps are re-sampled from the random generator of their seed until a path from start to goal exists.
+        '''
+        rngs = [np.random.default_rng(seed) for seed in seeds]
+        holes = self.randomize_hole_masks(size, rngs, frozen_tiles_ratio)
+        unsolvable = ~self.get_reachable_cells(holes)[:, -1, -1]
+        
+        attempts = 1
+        while unsolvable.any():
+            if attempts >= max_attempts:
+                raise Exception(f'No solvable {size}x{size} map found in {max_attempts} attempts')
+            resampled = np.flatnonzero(unsolvable)
+            logging.debug(f'Re-sampling {len(resampled)} unsolvable maps')
+            holes[resampled] = self.randomize_hole_masks(size, [rngs[i] for i in resampled], frozen_tiles_ratio)
+            unsolvable[resampled] = ~self.get_reachable_cells(holes[resampled])[:, -1, -1]
+            attempts += 1
+        
+        maps = np.full(holes.shape, 'F')
+        maps[holes] = 'H'
+        maps[:, 0, 0] = 'S'
+        maps[:, -1, -1] = 'G'
+        
+        return maps
+    
+    def generate_maps(self, sizes, seeds, frozen_tiles_ratio=0.8):
+        folder = os.path.abspath(self._FILES_PATH)
+        if not os.path.exists(folder):
+            os.makedirs(folder)
+        
+        for size in sizes:
+            logging.info(f'Generating {len(seeds)} solvable {size}x{size} maps')
+            maps = self.generate_map_arrays(size, seeds, frozen_tiles_ratio)
+            for seed, map_array in zip(seeds, maps):
+                self.save_map([''.join(row) for row in map_array], size, seed)
+    
+    def get_text_file(self, size, seed):
+        return os.path.abspath(f'{self._FILES_PATH}/{self.get_file_name(size, seed)}.txt')
+    
+    def get_xlsx_file(self, size, seed):
+        return os.path.abspath(f'{self._FILES_PATH}/{self.get_file_name(size, seed)}.xlsx')
+    
+    def save_map(self, map_desc, size, seed):
+        with open(self.get_text_file(size, seed), 'w') as file:
+            file.write('\n'.join(map_desc))
+    
+    def export_xlsx(self, size, seed):
+        self.write_xlsx(self.parse_map(size, seed), self.get_xlsx_file(size, seed))
+    
+    def import_xlsx(self, size, seed):
+        self.save_map(self.parse_xlsx_map(size, seed), size, seed)
+        
+    def write_xlsx(self, map_desc, file):
+        size = len(map_desc)
         workbook = Workbook(file)
         
         workbook.save(filename=file)
@@ -118,30 +226,44 @@ class MapTools():
             sheet[cell] = i
 
         '''
-        Create frozen tiles
-        '''
-        for i in range(1, size+1):
-            for j in range(1, size+1):
-                cell = f'{get_column_letter(i+1)}{j+1}'
-                self.create_ice(sheet, cell)
-        '''
-        Create start and goal
+        Create tiles
         '''
-        self.create_start(sheet, self.index_to_cell(0, 0))
-        self.create_goal(sheet, self.index_to_cell(size-1, size-1))
+        tile_creators = {'F': self.create_ice, 'H': self.create_hole, 'S': self.create_start, 'G': self.create_goal}
+        for row in range(size):
+            for col in range(size):
+                tile_creators[map_desc[row][col]](sheet, self.index_to_cell(row, col))
+        
+        workbook.save(filename=file)
         
+    def parse_map(self, size, seed):
         '''
-        Create holes
+        Maps are read from the plain-text format (one row of S/F/H/G letters per line) when available,
+        otherwise from the .xlsx workbook through an on-disk cache keyed by the modification time and size of the workbook.
         '''
-        holes = self.randomize_holes(size=size, seed=seed)
-        for hole in holes:
-            (row, col) = self.sequence_to_coordinates(hole, size)
-            self.create_hole(sheet, self.index_to_cell(row, col))
+        text_file = self.get_text_file(size, seed)
+        if os.path.exists(text_file):
+            with open(text_file, 'r') as file:
+                return file.read().split()
         
-        workbook.save(filename=file)
+        xlsx_file = self.get_xlsx_file(size, seed)
+        stat = os.stat(xlsx_file)
+        cache_key = [stat.st_mtime_ns, stat.st_size]
+        cache_file = os.path.abspath(f'{self._FILES_PATH}/.map-cache/{self.get_file_name(size, seed)}.json')
+        if os.path.exists(cache_file):
+            with open(cache_file, 'r') as file:
+                cached_map = json.load(file)
+            if cached_map['key'] == cache_key:
+                return cached_map['map_desc']
         
-    def parse_map(self, size, seed):
-        file = os.path.abspath(f'{self._FILES_PATH}/{self.get_file_name(size, seed)}.xlsx')
+        map_desc = self.parse_xlsx_map(size, seed)
+        os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+        with open(cache_file, 'w') as file:
+            json.dump({'key': cache_key, 'map_desc': map_desc}, file)
+        
+        return map_desc
+        
+    def parse_xlsx_map(self, size, seed):
+        file = self.get_xlsx_file(size, seed)
         workbook = load_workbook(filename=file)
         
         sheet = workbook.active
@@ -165,6 +287,7 @@ class MapTools():
         self.render_map_from_description(map_desc, imgfile)
     
     def render_map_from_description(self, map_desc, imgfile):
+        import gym # only needed for rendering, keeps map parsing free of the gym import
         env = gym.make('FrozenLake-v1', desc=map_desc, render_mode='rgb_array')
         env.reset()
         img = env.render()
@@ -176,22 +299,34 @@ if __name__ == '__main__':
     parser.add_argument('--generate', action='store_true')
     parser.add_argument('--render', action='store_true')
     parser.add_argument('--default', action='store_true')
+    parser.add_argument('--xlsx', action='store_true', help='Also write generated maps as .xlsx workbooks.')
+    parser.add_argument('--import-xlsx', action='store_true', help='Convert the .xlsx workbook of a map into the plain-text format.')
+    parser.add_argument('--export-xlsx', action='store_true', help='Convert the plain-text format of a map into an .xlsx workbook.')
     parser.add_argument('--size')
     parser.add_argument('--seed')
+    parser.add_argument('--sizes', nargs='+', type=int, help='Generate solvable maps of every size for every seed in --seeds.')
+    parser.add_argument('--seeds', nargs='+', type=int)
 
     options = parser.parse_args()
     
     map_tools = MapTools('./02-maps')
     if(options.default):
         map_tools.render_default_map()
+    elif(options.sizes):
+        assert options.seeds
+        map_tools.generate_maps(options.sizes, options.seeds)
     else:
         assert options.size
         assert options.seed
         size = int(options.size)
         seed = int(options.seed)
         if(options.generate):
-            map_tools.generate_map(size, seed)
+            map_tools.generate_map(size, seed, xlsx=options.xlsx)
+        if(options.import_xlsx):
+            map_tools.import_xlsx(size, seed)
+        if(options.export_xlsx):
+            map_tools.export_xlsx(size, seed)
         if(options.render):
             map_tools.render_random_map(size, seed)
-        else:
-            raise Exception('Either --generate or --render (or both) should be chosen.')
\ No newline at end of file
+        elif not (options.generate or options.import_xlsx or options.export_xlsx):
+            raise Exception('Either --generate, --import-xlsx, --export-xlsx or --render should be chosen.')
\ No newline at end of file
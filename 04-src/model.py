@@ -1,4 +1,5 @@
 from enum import Enum
+from functools import lru_cache
 import numpy as np
 
 class Direction(Enum):
@@ -7,12 +8,29 @@ class Direction(Enum):
     RIGHT = 2
     UP = 3
 
+DIRECTIONS = tuple(Direction)
+
+OPINION_TOLERANCE = 1e-9
+
+'''
+Checks a batch of opinions given as arrays of components: b + d + u = 1 and every component within [0, 1], up to the tolerance
+'''
+def validate_opinion_components(b, d, u, a, tolerance: float = OPINION_TOLERANCE):
+    b, d, u, a = (np.asarray(component, dtype=float) for component in (b, d, u, a))
+    assert(np.all(np.abs(b + d + u - 1) <= tolerance))
+    assert(all(np.all((component >= -tolerance) & (component <= 1 + tolerance)) for component in (b, d, u, a)))
+
 """
 Represents a grid of cells
+
+The topology of a grid is computed once per edge size as read-only NumPy tables indexed by (cell sequence number, direction):
+the sequence number of the neighbor in that direction, and the action that leads from that neighbor back to the cell (-1 where
+the neighbor would be off the grid). All grids and cells of the same edge size share these tables.
 """
 class Grid():
     def __init__(self, edge_size:int):
         self.edge_size = edge_size
+        self.neighbors, self.inbound_actions = Grid.get_topology(edge_size)
         self.cells =  []
         
         for row in range(edge_size):
@@ -20,6 +38,27 @@ class Grid():
                 cell = Cell(row, col, edge_size)
                 self.cells.append(cell)
     
+    @staticmethod
+    @lru_cache(maxsize=None)
+    def get_topology(edge_size:int):
+        states = np.arange(edge_size**2)
+        rows, cols = np.divmod(states, edge_size)
+        
+        # columns follow the Direction encoding: LEFT, DOWN, RIGHT, UP
+        neighbors = np.stack([
+            np.where(cols > 0, states-1, -1),
+            np.where(rows < edge_size-1, states+edge_size, -1),
+            np.where(cols < edge_size-1, states+1, -1),
+            np.where(rows > 0, states-edge_size, -1)], axis=1)
+        
+        # the way back from a neighbor is the opposite direction: LEFT <-> RIGHT, DOWN <-> UP
+        inbound_actions = np.where(neighbors >= 0, (np.arange(len(Direction))+2) % len(Direction), -1)
+        
+        neighbors.setflags(write=False)
+        inbound_actions.setflags(write=False)
+        
+        return neighbors, inbound_actions
+    
     def get_cell_by_coordinates(self, row:int, col:int):
         return self.cells[row*self.edge_size + col]
         
@@ -27,13 +66,29 @@ class Grid():
         return self.cells[sequence_number]
 
 """
-Represents a cell
+Represents a cell: a lightweight view of one row of the topology tables of its grid. The row is converted to Python values,
+which are faster than NumPy scalars for the per-cell queries, on the first query. Cells outside the grid (e.g. placeholders)
+have no neighbors.
 """
 class Cell():
+    __slots__ = ('row', 'col', 'edge_size', '_neighbors', '_inbound_actions')
+    
     def __init__(self, row:int, col:int, edge_size:int):
         self.row = row
         self.col = col
         self.edge_size = edge_size
+        self._neighbors = None
+        self._inbound_actions = None
+    
+    def resolve_topology(self):
+        if not (0 <= self.row < self.edge_size and 0 <= self.col < self.edge_size):
+            self._neighbors, self._inbound_actions = (None,)*len(DIRECTIONS), (None,)*len(DIRECTIONS)
+            return
+        
+        neighbors, inbound_actions = Grid.get_topology(self.edge_size)
+        sequence_number = self.get_sequence_number_in_grid()
+        self._neighbors = tuple([None if neighbor < 0 else divmod(neighbor, self.edge_size) for neighbor in neighbors[sequence_number].tolist()])
+        self._inbound_actions = tuple([None if action < 0 else DIRECTIONS[action] for action in inbound_actions[sequence_number].tolist()])
         
     def __str__(self):
         return '({}, {})'.format(self.row, self.col)
@@ -45,39 +100,31 @@ class Cell():
         return self.row*self.edge_size + self.col
         
     def get_cell_in_direction(self, direction:Direction):
-        if(direction == Direction.LEFT):
-            return None if self.col == 0 else [self.row, self.col-1]
-        elif(direction == Direction.DOWN):
-            return None if self.row == self.edge_size-1 else [self.row+1, self.col]
-        elif(direction == Direction.RIGHT):
-            return None if self.col == self.edge_size-1 else [self.row, self.col+1]
-        elif(direction == Direction.UP):
-            return None if self.row == 0 else [self.row-1, self.col]
+        if self._neighbors is None:
+            self.resolve_topology()
+        neighbor = self._neighbors[direction.value]
+        return None if neighbor is None else list(neighbor)
         
     def get_neighbors(self):
-        return [self.get_cell_in_direction(d) for d in Direction]
+        if self._neighbors is None:
+            self.resolve_topology()
+        return [None if neighbor is None else list(neighbor) for neighbor in self._neighbors]
     
     def get_action_to_me_from_neighbor(self, direction:Direction):
-        if self.get_cell_in_direction(direction) is None:
-            return None
-        
-        if(direction == Direction.LEFT):
-            return Direction.RIGHT
-        elif(direction == Direction.DOWN):
-            return Direction.UP
-        elif(direction == Direction.RIGHT):
-            return Direction.LEFT
-        elif(direction == Direction.UP):
-            return Direction.DOWN
+        if self._inbound_actions is None:
+            self.resolve_topology()
+        return self._inbound_actions[direction.value]
     
     def get_actions_to_me_from_all_neighbors(self):
-        state_action_pairs = [(self.get_cell_in_direction(d), self.get_action_to_me_from_neighbor(d)) for d in Direction]
-        return [sap for sap in state_action_pairs if None not in sap]
+        if self._neighbors is None:
+            self.resolve_topology()
+        return [(list(neighbor), action) for neighbor, action in zip(self._neighbors, self._inbound_actions) if neighbor is not None]
 
 """
 Represents an fact about a cell (F/H/G in Frozen Lake)
 """
 class Fact():
+    __slots__ = ('cell', 'value')
 
     def __init__(self, cell:Cell, value:int):
         self.cell = cell
@@ -102,6 +149,7 @@ class AdvisorInput():
 Advice: Value of a cell
 """
 class Advice():
+    __slots__ = ('cell', 'value')
 
     def __init__(self, cell:Cell, value:int):
         self.cell = cell
@@ -130,6 +178,10 @@ class AdvisorOpinions():
     def advice_to_opinions(self):
         pass
 
+    def validate(self, tolerance: float = OPINION_TOLERANCE):
+        components = np.array([opinion.opinion_tuple for opinion in self.opinion_list], dtype=float).reshape(-1, 4)
+        validate_opinion_components(*components.T, tolerance=tolerance)
+
 """
 Synthetic-Advisor Opinions: A list of opinions at uniform uncertainty
 """
@@ -145,8 +197,9 @@ class SyntheticAdvisorOpinions(AdvisorOpinions):
     def advice_to_opinions(self):
         for advice in self.advisor_input.advice_list:
             b, d = self.normalize_belief_for_uncertainty(advice_value = advice.value, u = self.u)
-            opinion = Opinion(advice.cell, b, d, self.u, self.base_rate)
+            opinion = Opinion(advice.cell, b, d, self.u, self.base_rate, validate=False)
             self.opinion_list.append(opinion)
+        self.validate()
 
 """
 Human-Advisor Opinions: A list of opinions with uncertainty modulated as a function of advisor distance
@@ -177,8 +230,9 @@ class HumanAdvisorOpinions(AdvisorOpinions):
             else:
                 u = round(self.get_uncertainty(cell = advice.cell), 4)
             b, d = self.normalize_belief_for_uncertainty(advice_value = advice.value, u = u)
-            opinion = Opinion(advice.cell, b, d, u, self.base_rate)
+            opinion = Opinion(advice.cell, b, d, u, self.base_rate, validate=False)
             self.opinion_list.append(opinion)
+        self.validate()
 
     def get_uncertainty(self, cell: Cell):
         distance = self.get_manhattan_distance(cell)
@@ -190,15 +244,26 @@ class HumanAdvisorOpinions(AdvisorOpinions):
 
 """
 Opinion: An binomial opinion (belief, disbelief, uncertainty, base rate) about a cell
+
+Opinions are validated on construction unless created with validate=False. Code that creates many opinions at once
+(advisor opinions, fusion) skips the per-opinion checks and validates the whole batch once instead.
 """
 class Opinion():
+    __slots__ = ('cell', 'b', 'd', 'u', 'a')
 
-    def __init__(self, cell:Cell, b: float, d: float, u: float, a:float):
+    def __init__(self, cell:Cell, b: float, d: float, u: float, a:float, validate: bool = True):
         self.cell = cell
         self.b, self.d, self.u, self.a = b, d, u, a
-        self.opinion_tuple = (self.b, self.d, self.u, self.a)
-        assert(self.b + self.d + self.u == 1) 
-        assert(0.0 <= (self.b and self.d and self.u and self.a) <= 1.0) 
+        if validate:
+            self.validate()
+        
+    @property
+    def opinion_tuple(self):
+        return (self.b, self.d, self.u, self.a)
+        
+    def validate(self, tolerance: float = OPINION_TOLERANCE):
+        assert(abs(self.b + self.d + self.u - 1) <= tolerance)
+        assert(all(-tolerance <= component <= 1 + tolerance for component in self.opinion_tuple))
         
     def __str__(self):
-        return f'Opinion (b = {self.b}, d = {self.d}, u = {self.u}, a = {self.a}) about cell {self.cell}.'
\ No newline at end of file
+        return f'Opinion (b = {self.b}, d = {self.d}, u = {self.u}, a = {self.a}) about cell {self.cell}.'
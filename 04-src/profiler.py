@@ -0,0 +1,73 @@
+import json
+import time
+from contextlib import contextmanager, nullcontext
+
+"""
+Per-phase wall time and call counts of an experiment run, plus counters of the work done (episodes, steps).
+
+Phases can be nested (e.g. shaping within training), so their times overlap and do not add up to the wall time.
+Worker processes profile their own jobs; their totals are merged into the profiler of the main process. A disabled
+profiler records nothing and costs one attribute check per phase.
+"""
+class Profiler():
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.reset()
+
+    def reset(self):
+        self.times = {}
+        self.calls = {}
+        self.counters = {}
+        self._START = time.perf_counter()
+
+    def phase(self, name):
+        if not self.enabled:
+            return nullcontext()
+        return self.timed_phase(name)
+
+    @contextmanager
+    def timed_phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - start)
+
+    def add_time(self, name, seconds, calls=1):
+        self.times[name] = self.times.get(name, 0.0) + seconds
+        self.calls[name] = self.calls.get(name, 0) + calls
+
+    def count(self, name, value=1):
+        if self.enabled:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def get_state(self):
+        return {'times': self.times, 'calls': self.calls, 'counters': self.counters}
+
+    def merge(self, state):
+        if state is None:
+            return
+        for name, seconds in state['times'].items():
+            self.add_time(name, seconds, state['calls'][name])
+        for name, value in state['counters'].items():
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def get_summary(self, metadata=None):
+        training_time = self.times.get('training', 0.0)
+        summary = {
+            'wall_time': time.perf_counter() - self._START,
+            'phases': {name: {'time': self.times[name], 'calls': self.calls[name]} for name in sorted(self.times)},
+            'counters': dict(sorted(self.counters.items())),
+            # throughput of the training itself, summed over all worker processes
+            'episodes_per_second': self.counters.get('episodes', 0) / training_time if training_time > 0 else None,
+            'steps_per_second': self.counters.get('steps', 0) / training_time if training_time > 0 else None
+        }
+        if metadata is not None:
+            summary['metadata'] = metadata
+
+        return summary
+
+    def save(self, file_name, metadata=None):
+        with open(file_name, 'w') as file:
+            json.dump(self.get_summary(metadata), file, indent=2)
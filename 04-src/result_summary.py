@@ -0,0 +1,109 @@
+import numpy as np
+import os
+
+SUMMARY_QUANTILES = (0.05, 0.25, 0.5, 0.75, 0.95)
+
+"""
+Streaming statistics over the repetitions of one configuration, updated row by row (one row per repetition).
+
+Every column (e.g. the cumulative reward after each episode) gets its mean and variance (Welford, merged batch-wise
+after Chan et al.), quantiles from a reservoir sample of the rows (exact as long as there are at most reservoir_size
+rows), and a confidence interval of the mean from a Poisson bootstrap: every replicate weighs each row by a Poisson(1)
+count, so replicates can be updated without keeping the rows. Memory stays at (reservoir_size + bootstrap_size) rows
+however many repetitions there are. Random draws depend only on the seed and the order of the rows, so a summary
+rebuilt from the rows of an interrupted run equals the one of an uninterrupted run.
+"""
+class ResultSummary():
+
+    def __init__(self, columns, seed=0, reservoir_size=100, bootstrap_size=100, confidence=0.95):
+        self.columns = columns
+        self.confidence = confidence
+        self.count = 0
+        self.mean = np.zeros(columns)
+        self.m2 = np.zeros(columns)
+
+        reservoir_seed, bootstrap_seed = np.random.SeedSequence(seed).spawn(2)
+        self._RESERVOIR_RNG = np.random.default_rng(reservoir_seed)
+        self._BOOTSTRAP_RNG = np.random.default_rng(bootstrap_seed)
+        self.reservoir = np.zeros((reservoir_size, columns))
+        self.bootstrap_sums = np.zeros((bootstrap_size, columns))
+        self.bootstrap_weights = np.zeros(bootstrap_size)
+
+    def update(self, rows):
+        rows = np.asarray(rows, dtype=float).reshape(-1, self.columns)
+        if len(rows) == 0:
+            return
+
+        # Welford/Chan: merge the mean and sum of squared deviations of the new rows into the running ones
+        count = self.count + len(rows)
+        rows_mean = rows.mean(axis=0)
+        delta = rows_mean - self.mean
+        self.m2 += ((rows - rows_mean)**2).sum(axis=0) + delta**2 * self.count * len(rows) / count
+        self.mean += delta * len(rows) / count
+
+        # reservoir sampling (algorithm R)
+        for i, row in enumerate(rows, start=self.count):
+            if i < len(self.reservoir):
+                self.reservoir[i] = row
+            else:
+                j = self._RESERVOIR_RNG.integers(i+1)
+                if j < len(self.reservoir):
+                    self.reservoir[j] = row
+
+        weights = self._BOOTSTRAP_RNG.poisson(1.0, size=(len(rows), len(self.bootstrap_weights)))
+        self.bootstrap_sums += weights.T @ rows
+        self.bootstrap_weights += weights.sum(axis=0)
+
+        self.count = count
+
+    def get_summary(self):
+        variance = self.m2 / (self.count - 1) if self.count > 1 else np.zeros(self.columns)
+        sample = self.reservoir[:min(self.count, len(self.reservoir))]
+
+        # replicates in which every row got a zero weight have no mean
+        replicates = self.bootstrap_weights > 0
+        replicate_means = self.bootstrap_sums[replicates] / self.bootstrap_weights[replicates, np.newaxis]
+        if replicates.any():
+            ci_low, ci_high = np.quantile(replicate_means, [(1 - self.confidence) / 2, (1 + self.confidence) / 2], axis=0)
+        else:
+            ci_low, ci_high = self.mean.copy(), self.mean.copy()
+
+        return {
+            'count': self.count,
+            'mean': self.mean.copy(),
+            'std': np.sqrt(variance),
+            'ci_low': ci_low,
+            'ci_high': ci_high,
+            'confidence': self.confidence,
+            'quantile_levels': np.array(SUMMARY_QUANTILES),
+            'quantiles': np.quantile(sample, SUMMARY_QUANTILES, axis=0) if len(sample) > 0 else np.full((len(SUMMARY_QUANTILES), self.columns), np.nan)
+        }
+
+    def save(self, file_name):
+        temporary_file_name = f'{file_name}.summary.{os.getpid()}.tmp'
+        with open(temporary_file_name, 'wb') as file:
+            np.savez(file, **self.get_summary())
+        os.replace(temporary_file_name, get_summary_file_name(file_name))
+
+    @staticmethod
+    def load(file_name):
+        summary_file_name = get_summary_file_name(file_name)
+        if not os.path.exists(summary_file_name):
+            return None
+
+        with np.load(summary_file_name) as summary:
+            return {name: summary[name][()] if summary[name].ndim == 0 else summary[name] for name in summary.files}
+
+    @staticmethod
+    def from_rows(rows, **kwargs):
+        rows = np.asarray(rows, dtype=float)
+        summary = ResultSummary(rows.shape[1], **kwargs)
+        summary.update(rows)
+
+        return summary
+
+'''
+Summary file of the result file {file_name}.npy or {file_name}.csv
+'''
+def get_summary_file_name(file_name):
+    return f'{file_name}.summary.npz'
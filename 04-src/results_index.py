@@ -0,0 +1,145 @@
+import glob
+import json
+import logging
+import numpy as np
+import os
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+from results_store import ResultStore
+from result_summary import ResultSummary
+
+"""
+One result file of an experiment folder: {folder}/{episodes}/{data_kind}_data/{agent}/{name}.{npy|csv}
+"""
+class ResultEntry():
+
+    def __init__(self, episodes, data_kind, agent, name, file_name, result_format):
+        self.episodes = episodes
+        self.data_kind = data_kind
+        self.agent = agent
+        self.name = name
+        self.file_name = file_name
+        self.result_format = result_format
+
+    def __str__(self):
+        return f'{self.episodes}/{self.data_kind}/{self.agent}/{self.name}'
+
+    def get_parameter(self, file_pattern, key):
+        # value of a file suffix such as -u-0.2 after the map part of the name, None if there is none
+        suffix = self.name[len(file_pattern):].split('-')
+        return float(suffix[suffix.index(key)+1]) if key in suffix[:-1] else None
+
+"""
+Index of every result file of an experiment folder, each parsed at most once.
+
+The folder is scanned once for every (episodes, data kind, agent, name) combination. Loaded results are kept in memory
+as data frames, so analyses can query the same configuration (e.g. the noadvice and random baselines) any number of
+times. Missing results are loaded in parallel on a thread pool: binary results are memory-mapped, CSV results are
+parsed and, with cache, kept as .npz files in {folder}/.analysis-cache, which are reused until the CSV file changes.
+Summaries (mean, standard deviation, confidence interval and quantiles per column) are read from the summary files
+the runner writes next to complete results, and only computed from the rows where there is none.
+"""
+class ResultIndex():
+
+    def __init__(self, folder, workers=8, cache=True):
+        self._FOLDER = folder
+        self._WORKERS = workers
+        self._CACHE_FOLDER = f'{folder}/.analysis-cache' if cache else None
+        self._RESULT_STORE = ResultStore()
+        self._DATA_FRAMES = {}
+        self._SUMMARIES = {}
+
+        self.entries = self.discover()
+
+    def discover(self):
+        entries = {}
+        for path in sorted(glob.glob(os.path.join(glob.escape(self._FOLDER), '*', '*_data', '*', '*'))):
+            episodes, data_folder, agent, file = os.path.relpath(path, self._FOLDER).split(os.sep)
+            name, extension = os.path.splitext(file)
+            if not episodes.isdigit() or extension not in ['.npy', '.csv']:
+                continue
+
+            # binary results are preferred over CSV exports of the same result
+            key = (int(episodes), data_folder[:-len('_data')], agent, name)
+            if key not in entries or extension == '.npy':
+                entries[key] = ResultEntry(*key, path[:-len(extension)], extension[1:])
+
+        logging.debug(f'Found {len(entries)} results in {self._FOLDER}')
+
+        return list(entries.values())
+
+    def find(self, episodes=None, data_kind=None, agent=None, name=None):
+        return [entry for entry in self.entries
+            if (episodes is None or entry.episodes == episodes) and (data_kind is None or entry.data_kind == data_kind)
+            and (agent is None or entry.agent == agent) and (name is None or entry.name == name)]
+
+    def find_one(self, episodes, data_kind, agent, name):
+        entries = self.find(episodes, data_kind, agent, name)
+        if not entries:
+            raise Exception(f'No result {episodes}/{data_kind}/{agent}/{name} in {self._FOLDER}')
+
+        return entries[0]
+
+    def get(self, episodes, data_kind, agent, name):
+        return self.load([self.find_one(episodes, data_kind, agent, name)])[0]
+
+    def load(self, entries):
+        missing_entries = [entry for entry in entries if entry.file_name not in self._DATA_FRAMES]
+        if len(missing_entries) > 1 and self._WORKERS > 1:
+            with ThreadPoolExecutor(max_workers=min(self._WORKERS, len(missing_entries))) as pool:
+                data_frames = list(pool.map(self.load_entry, missing_entries))
+        else:
+            data_frames = [self.load_entry(entry) for entry in missing_entries]
+
+        self._DATA_FRAMES.update((entry.file_name, data_frame) for entry, data_frame in zip(missing_entries, data_frames))
+
+        return [self._DATA_FRAMES[entry.file_name] for entry in entries]
+
+    def load_summaries(self, entries):
+        missing_entries = [entry for entry in entries if entry.file_name not in self._SUMMARIES]
+        summaries = [ResultSummary.load(entry.file_name) for entry in missing_entries]
+
+        # a summary only holds for the rows it was computed from; otherwise it is left over from an earlier run
+        stale_entries = [entry for entry, summary in zip(missing_entries, summaries) if summary is not None and summary['count'] != self.get_completed_rows(entry)]
+        if stale_entries:
+            logging.warning(f'Ignoring {len(stale_entries)} summaries that do not match their results: {", ".join(map(str, stale_entries))}')
+        summaries = [None if entry in stale_entries else summary for entry, summary in zip(missing_entries, summaries)]
+
+        entries_without_summary = [entry for entry, summary in zip(missing_entries, summaries) if summary is None]
+        computed_summaries = iter([ResultSummary.from_rows(data_frame.to_numpy()[:self.get_completed_rows(entry)]).get_summary()
+            for entry, data_frame in zip(entries_without_summary, self.load(entries_without_summary))])
+        if entries_without_summary:
+            logging.debug(f'Computed {len(entries_without_summary)} missing summaries from the results')
+
+        self._SUMMARIES.update((entry.file_name, summary if summary is not None else next(computed_summaries)) for entry, summary in zip(missing_entries, summaries))
+
+        return [self._SUMMARIES[entry.file_name] for entry in entries]
+
+    def get_completed_rows(self, entry):
+        # the runner records the completed rows in the metadata, plain result files are complete
+        completed = self._RESULT_STORE.load_metadata(entry.file_name).get('completed')
+
+        return completed if completed is not None else len(self.load([entry])[0])
+
+    def load_entry(self, entry):
+        if entry.result_format == 'npy':
+            return pd.DataFrame(self._RESULT_STORE.load(entry.file_name))
+        if self._CACHE_FOLDER is None:
+            return pd.read_csv(f'{entry.file_name}.csv', header=None)
+
+        stat = os.stat(f'{entry.file_name}.csv')
+        cache_key = json.dumps([str(entry), stat.st_mtime_ns, stat.st_size])
+        cache_file = f'{self._CACHE_FOLDER}/{entry.episodes}-{entry.data_kind}-{entry.agent}-{entry.name}.npz'
+        if os.path.exists(cache_file):
+            with np.load(cache_file) as cached_result:
+                if str(cached_result['key']) == cache_key:
+                    return pd.DataFrame(cached_result['data'])
+
+        data_frame = pd.read_csv(f'{entry.file_name}.csv', header=None)
+
+        os.makedirs(self._CACHE_FOLDER, exist_ok=True)
+        with open(f'{cache_file}.{os.getpid()}.{id(entry)}.tmp', 'wb') as file:
+            np.savez(file, key=np.array(cache_key), data=data_frame.to_numpy())
+        os.replace(f'{cache_file}.{os.getpid()}.{id(entry)}.tmp', cache_file)
+
+        return data_frame
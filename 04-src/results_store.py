@@ -0,0 +1,133 @@
+import json
+import numpy as np
+import os
+from result_summary import ResultSummary, get_summary_file_name
+
+"""
+Reads and writes experiment results (one matrix per configuration, one row per experiment).
+
+Binary results are stored as a memory-mappable .npy file with a .json sidecar holding the metadata
+of the configuration (mode, quota, u, seed, episodes, ...). CSV files can still be written for
+external tools, and are read transparently when no binary file exists.
+"""
+class ResultStore():
+
+    def __init__(self, result_format='npy'):
+        if result_format not in ['npy', 'csv']:
+            raise Exception(f'Unknown result format {result_format}')
+        self._FORMAT = result_format
+
+    def save(self, data, file_name, metadata=None):
+        if self._FORMAT == 'npy':
+            np.save(f'{file_name}.npy', np.asarray(data, dtype=float))
+        else:
+            np.savetxt(f'{file_name}.csv', data, delimiter=",")
+
+        # a summary of an earlier result saved under the same name does not describe the new one
+        if os.path.exists(get_summary_file_name(file_name)):
+            os.remove(get_summary_file_name(file_name))
+
+        if metadata is not None:
+            with open(f'{file_name}.json', 'w') as file:
+                json.dump(metadata, file, indent=2)
+
+    def exists(self, file_name):
+        return os.path.exists(f'{file_name}.npy') or os.path.exists(f'{file_name}.csv')
+
+    def load(self, file_name, mmap_mode='r'):
+        if os.path.exists(f'{file_name}.npy'):
+            return np.load(f'{file_name}.npy', mmap_mode=mmap_mode)
+
+        return np.loadtxt(f'{file_name}.csv', delimiter=",", ndmin=2)
+
+    def load_metadata(self, file_name):
+        if not os.path.exists(f'{file_name}.json'):
+            return {}
+
+        with open(f'{file_name}.json', 'r') as file:
+            return json.load(file)
+
+    def open_writer(self, file_name, shape, metadata=None, resume=False, summary=False):
+        return ResultWriter(self._FORMAT, file_name, shape, metadata, resume, summary)
+
+"""
+Writes a result matrix row by row (one row per experiment) as the experiments finish.
+
+Only the file on disk holds the matrix, so memory stays flat regardless of the number of rows. The number
+of completed rows is recorded in the metadata after every row; when resuming, writing continues after the
+last completed row, provided the metadata of the configuration has not changed. With summary, the statistics of
+the rows written so far are kept up to date, and saved next to the matrix once it is complete.
+"""
+class ResultWriter():
+
+    def __init__(self, result_format, file_name, shape, metadata=None, resume=False, summary=False):
+        self._FORMAT = result_format
+        self._FILE_NAME = file_name
+        self.shape = tuple(shape)
+        self.metadata = dict(metadata if metadata is not None else {}, rows=self.shape[0], columns=self.shape[1])
+        self.completed = 0
+
+        if resume:
+            self.completed = self.get_completed_rows()
+
+        if self._FORMAT == 'npy':
+            mode = 'r+' if self.completed > 0 else 'w+'
+            self._data = np.lib.format.open_memmap(f'{file_name}.npy', mode=mode, dtype=float, shape=self.shape)
+        else:
+            lines = []
+            if self.completed > 0:
+                with open(f'{file_name}.csv', 'r') as file:
+                    lines = file.readlines()[:self.completed]
+            with open(f'{file_name}.csv', 'w') as file:
+                file.writelines(lines)
+
+        self.write_metadata()
+
+        self.summary = None
+        if summary:
+            self.summary = ResultSummary(self.shape[1])
+            if self.completed > 0:
+                self.summary.update(ResultStore(self._FORMAT).load(file_name)[:self.completed])
+
+        if self.summary is not None and self.is_complete():
+            self.summary.save(file_name)
+        elif os.path.exists(get_summary_file_name(file_name)):
+            # the summary of a previous run of the configuration no longer matches the matrix
+            os.remove(get_summary_file_name(file_name))
+
+    def get_completed_rows(self):
+        previous_metadata = ResultStore(self._FORMAT).load_metadata(self._FILE_NAME)
+        if not previous_metadata or not os.path.exists(f'{self._FILE_NAME}.{self._FORMAT}'):
+            return 0
+
+        for key, value in self.metadata.items():
+            if previous_metadata.get(key) != value:
+                raise Exception(f'Cannot resume {self._FILE_NAME}: {key} was {previous_metadata.get(key)}, now {value}')
+
+        return previous_metadata.get('completed', 0)
+
+    def is_complete(self):
+        return self.completed >= self.shape[0]
+
+    def write(self, row):
+        row = np.asarray(row, dtype=float).reshape(self.shape[1])
+        if self._FORMAT == 'npy':
+            self._data[self.completed] = row
+            self._data.flush()
+        else:
+            with open(f'{self._FILE_NAME}.csv', 'a') as file:
+                np.savetxt(file, row[np.newaxis], delimiter=",")
+
+        self.completed += 1
+        self.write_metadata()
+
+        if self.summary is not None:
+            self.summary.update(row)
+            if self.is_complete():
+                self.summary.save(self._FILE_NAME)
+
+    def write_metadata(self):
+        # replace the metadata file atomically so that an interruption never leaves it half written
+        with open(f'{self._FILE_NAME}.json.tmp', 'w') as file:
+            json.dump(dict(self.metadata, completed=self.completed), file, indent=2)
+        os.replace(f'{self._FILE_NAME}.json.tmp', f'{self._FILE_NAME}.json')
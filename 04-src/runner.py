@@ -1,38 +1,152 @@
 import argparse
-import gym as gym
 import logging
 import numpy as np
 import os
-import pandas as pd
-import shutil
 import sl
-from model import SyntheticAdvisorOpinions, HumanAdvisorOpinions
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from model import SyntheticAdvisorOpinions, HumanAdvisorOpinions, Grid
+from frozen_lake import FrozenLake
+from results_store import ResultStore
+from cache import ResultCache, get_content_key
+from checkpoints import Checkpoint
+from profiler import Profiler
 from map_tools import MapTools
 from datetime import datetime
-from matplotlib import pyplot as plt
 from advice_parser import AdviceParser
-from scipy.stats import wilcoxon
-from scipy.special import softmax
+from scipy.special import softmax, entr
 from sklearn.preprocessing import normalize
 
+# version of the training, part of the keys of cached results and checkpoints: increase it whenever a change of the
+# training changes its results, so that results and checkpoints of an older training are not reused
+TRAINING_VERSION = 1
+
+"""
+Experiment configuration: one agent setup whose results are saved into one file
+"""
+class ExperimentConfig():
+    
+    def __init__(self, agent, description, advice=None, is_random=False, file_suffix=None, metadata=None):
+        self.agent = agent
+        self.description = description
+        self.advice = advice
+        self.is_random = is_random
+        self.file_suffix = file_suffix
+        self.metadata = metadata if metadata is not None else {}
+        
+    def get_name(self):
+        if self.file_suffix is None:
+            return self.agent
+        return f'{self.agent}-{self.file_suffix[0]}-{self.file_suffix[1]}'
+
+"""
+Convergence criteria for stopping training early, checked at the end of every window of episodes. An agent has converged
+once it has reached the goal in the last window and any of the enabled criteria is met:
+- entropy: the mean entropy (in nats) of the policy over the states visited in the last episode is at most this value;
+- plateau: the success rate of the last window differs from the one of the window before by at most this value (as a fraction);
+- theta: no numerical preference has changed by more than this value over the last window.
+The episodes after stopping are extrapolated with the mean reward and episode length of the last window.
+"""
+class EarlyStopping():
+    
+    def __init__(self, window=100, entropy=None, plateau=None, theta=None):
+        self.window = window
+        self.entropy = entropy
+        self.plateau = plateau
+        self.theta = theta
+    
+    def is_enabled(self):
+        return any(criterion is not None for criterion in [self.entropy, self.plateau, self.theta])
+    
+    def get_settings(self):
+        return {'window': self.window, 'entropy': self.entropy, 'plateau': self.plateau, 'theta': self.theta}
+    
+    def is_window_end(self, episode):
+        return self.is_enabled() and (episode+1) % self.window == 0
+    
+    def get_converged(self, total_reward, episode, theta, previous_theta, ep_states, ep_mask):
+        """
+        Convergence of every agent at the end of a window, from the rewards per episode (agents, episodes), the numerical
+        preferences now and at the end of the previous window (agents, states, actions), and the states visited in the last
+        episode (agents, steps) with the mask of the steps taken.
+        """
+        converged = np.zeros(len(total_reward), dtype=bool)
+        if episode+1 < 2*self.window:
+            return converged
+        
+        last_window = total_reward[:, episode+1-self.window:episode+1].mean(axis=1)
+        previous_window = total_reward[:, episode+1-2*self.window:episode+1-self.window].mean(axis=1)
+        
+        if self.entropy is not None:
+            entropies = entr(softmax(theta[np.arange(len(theta))[:, np.newaxis], ep_states], axis=2)).sum(axis=2)
+            converged |= (entropies * ep_mask).sum(axis=1) / np.maximum(ep_mask.sum(axis=1), 1) <= self.entropy
+        if self.plateau is not None:
+            converged |= np.abs(last_window - previous_window) <= self.plateau
+        if self.theta is not None:
+            converged |= np.abs(theta - previous_theta).max(axis=(1, 2)) <= self.theta
+        
+        # an agent that has not reached the goal lately has not started to learn yet
+        return converged & (last_window > 0)
+    
+    def fill(self, total_reward, episode_lengths, stopped_at):
+        for agent in np.flatnonzero(stopped_at < total_reward.shape[1]):
+            start = stopped_at[agent]
+            total_reward[agent, start:] = total_reward[agent, start-self.window:start].mean()
+            episode_lengths[agent, start:] = episode_lengths[agent, start-self.window:start].mean()
+
+"""
+Worker process state for parallel sweeps
+"""
+worker_runner = None
+
+def init_worker(runner):
+    global worker_runner
+    worker_runner = runner
+
+def run_worker_job(job):
+    # the profile of every job is sent back with its result and merged into the profile of the main process
+    worker_runner._PROFILER.reset()
+    result = worker_runner.run_job(job)
+    
+    return result, worker_runner._PROFILER.get_state() if worker_runner._PROFILER.enabled else None
+
 class Runner():
 
-    def __init__(self, size, seed, numexperiments, maxepisodes, log_level=logging.INFO):
+    def __init__(self, size, seed, numexperiments, maxepisodes, log_level=logging.INFO, batched=False, workers=1, rngseed=None, fusion_operator='bcf', result_format='npy', resume=False, cache=True, cache_size=2048, profile=False, early_stopping=None, checkpoint_every=None, warm_start_from=None, incremental=False, summary=True):
         self._SIZE = size
         self._SEED = seed
         self._BASERATE = 0.25 # TODO
         self._NUM_EXPERIMENTS = numexperiments
         self._MAX_EPISODES = maxepisodes
+        self._INCREMENTAL = incremental
+        self._BATCHED = batched
+        self._WORKERS = workers
+        # by default the seed only depends on the map, so that every run of a map can reuse cached results and checkpoints
+        self._RNG_SEED = rngseed if rngseed is not None else zlib.crc32(f'{size}x{size}-seed{seed}'.encode())
+        self._RNG_SEED_GIVEN = rngseed is not None
+        self._RESUME = resume
+        self._PROFILER = Profiler(profile)
         
         #Hyperparameters
         self._SLIPPERY = False
+        self._FUSION_OPERATOR = fusion_operator
+        self._EARLY_STOPPING = early_stopping if early_stopping is not None else EarlyStopping()
         self._ALPHA = 0.9
         self._GAMMA = 1
+        self._MAX_STEPS = 100 # time limit of FrozenLake-v1 in the gym registry
         
         #File paths
         self._INPUT_PATH = './03-input'
         self._reward_results_PATH = './05-experiments'
         self._FILE_PATTERN = f'{size}x{size}-seed{seed}'
+        self._RESULT_STORE = ResultStore(result_format)
+        self._SUMMARY = summary
+        self._CACHE = ResultCache(f'{self._reward_results_PATH}/.cache', cache_size) if cache else None
+        self._CHECKPOINT_EVERY = checkpoint_every
+        self._CHECKPOINT_FOLDER = None # set per experiment
+        self._WARM_START_FROM = warm_start_from
+        self._WARM_START_FOLDER = f'{self._reward_results_PATH}/{warm_start_from}/checkpoints' if warm_start_from is not None else None
         self._MAP_NAME = f'{size}x{size}'
         
         #Map
@@ -45,10 +159,15 @@ class Runner():
         #Logging
         logging.basicConfig(format='[%(levelname)s] %(message)s')
         logging.getLogger().setLevel(log_level)
+        logging.info(f'Random seed of the experiments: {self._RNG_SEED}')
         
+    def get_environment(self, rng=None):
+        with self._PROFILER.phase('environment'):
+            return FrozenLake(self._MAP_DESC, is_slippery=self._SLIPPERY, max_episode_steps=self._MAX_STEPS, seed=rng)
+    
     def get_default_policy(self, environment):
-        num_states = environment.observation_space.n
-        num_actions = environment.action_space.n
+        num_states = environment.num_states
+        num_actions = environment.num_actions
         
         default_policy = np.full((num_states, num_actions), 1/num_actions)
         
@@ -62,32 +181,39 @@ class Runner():
         logging.info(f'Parsing advice file {file}')
         advice_parser = AdviceParser()
         
-        return advice_parser.parse(file)
+        with self._PROFILER.phase('advice_parsing'):
+            return advice_parser.parse(file)
 
     def shape_policy(self, policy, advisor_opinions):
-        for advisor_opinion in advisor_opinions.opinion_list:
-            cell = advisor_opinion.cell
-            #logging.debug(cell)
-            for sap in cell.get_actions_to_me_from_all_neighbors():
-                neighbor_row, neighbor_col = sap[0]
-                neighbors_sequence_number = neighbor_row*cell.edge_size + neighbor_col
-                action_number = sap[1].value
-                
-                base_action_probability = policy[neighbors_sequence_number][action_number]
-                base_action_opinion = sl.probability_to_opinion(cell, base_action_probability)
+        policy = np.array(policy, dtype=float)
+        advice = advisor_opinions if isinstance(advisor_opinions, sl.OpinionTable) else sl.OpinionTable.from_advisor_opinions(advisor_opinions)
+        if len(advice) > 0:
+            neighbor_states, actions = Grid.get_topology(advice.edge_size)
+            cells = advice.cells
+            
+            # opinions about the same cell are fused one after the other, in the order of the opinion list
+            occurrence = sl.get_occurrences(cells)
+            
+            for fusion_round in range(occurrence.max()+1):
+                round_opinions = np.flatnonzero(occurrence == fusion_round)
+                opinion_index, directions = np.nonzero(neighbor_states[cells[round_opinions]] >= 0)
+                opinions = round_opinions[opinion_index]
+                states = neighbor_states[cells[opinions], directions]
+                state_actions = actions[cells[opinions], directions]
                 
-                fused_opinion = sl.beliefConstraintFusion(advisor_opinion, base_action_opinion)
-                fused_probability = sl.opinion_to_probability(fused_opinion)
+                advisor_opinions = advice.take(opinions)
+                base_action_opinions = sl.OpinionTable.from_probabilities(advisor_opinions.cells, policy[states, state_actions], advice.edge_size)
                 
-                policy[neighbors_sequence_number][action_number] = fused_probability
+                fused_opinions = sl.belief_constraint_fusion(advisor_opinions, base_action_opinions)
+                policy[states, state_actions] = sl.projected_probability(fused_opinions)
         
         policy = normalize(policy, axis=1, norm='l1')
         
         return policy
     
     def policy_to_numerical_preferences(self, policy, environment):
-        num_states = environment.observation_space.n
-        num_actions = environment.action_space.n
+        num_states = environment.num_states
+        num_actions = environment.num_actions
 
         theta = np.zeros((num_states, num_actions))
 
@@ -104,12 +230,23 @@ class Runner():
         return theta
 
     def get_action_probabilities(self, environment, state, policy):
-        logits = np.zeros(environment.action_space.n)
-        for action in range(environment.action_space.n):
-            logit = np.exp(policy[state, action])
-            logits[action] = logit
+        logits = np.exp(policy[state])
             
         return logits / np.sum(logits)
+    
+    def get_action_distributions(self, policy):
+        # softmax of numerical preferences and its CDF along the last axis, computed as in sample_action
+        logits = np.exp(policy)
+        action_probs = logits / logits.sum(axis=-1, keepdims=True)
+        cdf = np.cumsum(action_probs, axis=-1)
+        cdf /= cdf[..., -1:]
+        return action_probs, cdf
+    
+    def sample_action(self, action_probs, rng):
+        # inverse transform sampling, draws the same actions as rng.choice(len(action_probs), p=action_probs)
+        cdf = np.cumsum(action_probs)
+        cdf /= cdf[-1]
+        return int(cdf.searchsorted(rng.random(), side='right'))
         
     def calculate_return(self,rewards):
         # https://stackoverflow.com/questions/65233426/discount-reward-in-reinforce-deep-reinforcement-learning-algorithm
@@ -117,33 +254,40 @@ class Runner():
         t_steps = np.arange(ep_rewards.size)
         ep_returns = ep_rewards * self._GAMMA**t_steps
         ep_returns = ep_returns[::-1].cumsum()[::-1] / self._GAMMA**t_steps
-        return ep_returns.tolist()
+        return ep_returns
         
     def update_policy(self, policy, ep_states, ep_actions, ep_probs, ep_returns, environment):
-        for t in range(0, len(ep_states)):
-            state = ep_states[t]
-            action = ep_actions[t]
-            prob = ep_probs[t]
-            action_return = ep_returns[t]
-
-            phi = np.zeros([1, environment.action_space.n])
-            phi[0, action] = 1
+        ep_probs = np.asarray(ep_probs)
+        ep_returns = np.asarray(ep_returns)
+        
+        phi = np.zeros((len(ep_states), environment.num_actions))
+        phi[np.arange(len(ep_states)), ep_actions] = 1
 
-            score = phi - prob
-            policy[state, :] = policy[state, :] + self._ALPHA * action_return * score
+        # np.add.at applies the updates of repeated states one after the other, in the order of the time steps
+        score = phi - ep_probs
+        np.add.at(policy, ep_states, self._ALPHA * ep_returns[:, np.newaxis] * score)
 
         return policy
 
-    def discrete_policy_grad(self, max_episodes, advice=None, is_random=False):
+    def discrete_policy_grad(self, max_episodes, advice=None, is_random=False, rng=None, initial_policy=None, checkpoint=None, save_checkpoint=None, snapshots=None):
+        """
+        Trains one agent. The numerical preferences can be initialized from initial_policy (warm start), and training can continue
+        from a checkpoint. save_checkpoint(episodes, arrays) is called every self._CHECKPOINT_EVERY episodes and at the end.
+        With snapshots (ascending episode budgets up to max_episodes), a list with the result after each budget is returned.
+        """
+        rng = rng if rng is not None else np.random.default_rng()
+        snapshot_policies = dict.fromkeys(snapshots if snapshots is not None else [])
+        
         #Environment
-        environment = gym.make('FrozenLake-v1', desc=self._MAP_DESC, is_slippery=self._SLIPPERY)
+        environment = self.get_environment(rng)
 
         if is_random == True:
             logging.debug('Agent policy is random')
-            policy = np.zeros((environment.observation_space.n, environment.action_space.n))
+            policy = np.zeros((environment.num_states, environment.num_actions))
 
-            total_reward = []
-            steps_taken = []
+            total_reward = np.zeros(max_episodes)
+            cumulative_total_reward = 0
+            steps_taken = np.zeros((max_episodes, 2))
             for episode in range(max_episodes):
                 state = environment.reset()[0]
                 ep_states, ep_actions, ep_probs, ep_rewards, total_ep_rewards = [], [], [], [], 0
@@ -151,23 +295,28 @@ class Runner():
                 
                 i = 0
 
-                # gather trajectory
-                while not terminated and not truncated:
-                    i += 1
-                    ep_states.append(state)         # add state to ep_states list
+                with self._PROFILER.phase('trajectories'):
+                    # gather trajectory
+                    while not terminated and not truncated:
+                        i += 1
+                        ep_states.append(state)         # add state to ep_states list
                     
-                    action = environment.action_space.sample() # choose an action randomly
-                    ep_actions.append(action)       # add action to ep_actions list
+                        action = rng.integers(environment.num_actions) # choose an action randomly
+                        ep_actions.append(action)       # add action to ep_actions list
                     
-                    state, reward, terminated, truncated, __ = environment.step(action) # take step in environment
-                    ep_rewards.append(reward)       # add reward to ep_rewards list
+                        state, reward, terminated, truncated, __ = environment.step(action) # take step in environment
+                        ep_rewards.append(reward)       # add reward to ep_rewards list
                     
-                    total_ep_rewards += reward
+                        total_ep_rewards += reward
 
                 ep_returns = self.calculate_return(ep_rewards) # calculate episode return & add total episode reward to totalReward
-                total_reward.append(sum(ep_rewards))
+                total_reward[episode] = sum(ep_rewards)
+                cumulative_total_reward += total_reward[episode]
                 
-                steps_taken.append((i, sum(total_reward)))
+                steps_taken[episode] = (i, cumulative_total_reward)
+            
+            self._PROFILER.count('episodes', max_episodes)
+            self._PROFILER.count('steps', int(steps_taken[:, 0].sum()))
 
         else:
             logging.debug('Agent policy is not random')
@@ -176,7 +325,8 @@ class Runner():
             if advice:
                 original_policy = policy
                 #logging.info(f'\t\t\t Shaping policy with advisor 03-input at u={advice.u}') #TODO does not work with coop
-                policy = self.shape_policy(policy, advice)
+                with self._PROFILER.phase('shaping'):
+                    policy = self.shape_policy(policy, advice)
                 #if advice.u==1.0: # TODO does not work with coop
                 #    assert np.array_equal(original_policy, policy)
                 #    print(np.array_equal(original_policy, policy))
@@ -187,44 +337,97 @@ class Runner():
             logging.debug('Policy initialized. Exploring now.')
 
             policy = self.policy_to_numerical_preferences(policy, environment)
+            if initial_policy is not None:
+                policy = np.array(initial_policy, dtype=float)
 
-            total_reward = []
-            steps_taken = []
-            for episode in range(max_episodes):
+            total_reward = np.zeros(max_episodes)
+            cumulative_total_reward = 0
+            steps_taken = np.zeros((max_episodes, 2))
+            converged = np.zeros(1, dtype=bool)
+            previous_policy = policy.copy()
+            first_episode = 0
+            if checkpoint is not None:
+                first_episode = checkpoint.episodes
+                rng.bit_generator.state = checkpoint.rng_state
+                policy, previous_policy = checkpoint.arrays['policy'].copy(), checkpoint.arrays['previous_policy'].copy()
+                total_reward[:first_episode] = checkpoint.arrays['total_reward']
+                steps_taken[:first_episode] = checkpoint.arrays['steps_taken']
+                cumulative_total_reward = steps_taken[first_episode-1, 1] if first_episode > 0 else 0
+                converged = checkpoint.arrays['converged'].copy()
+                snapshot_policies.update(self.get_checkpoint_snapshots(checkpoint, snapshot_policies))
+            
+            episodes_trained = first_episode
+            for episode in range(first_episode, max_episodes):
+                if episode in snapshot_policies:
+                    snapshot_policies[episode] = policy.copy()
+                if converged[0]:
+                    break
+                
                 state = environment.reset()[0]
                 ep_states, ep_actions, ep_probs, ep_rewards, total_ep_rewards = [], [], [], [], 0
                 terminated, truncated = False, False
                 
                 i = 0
 
-                # gather trajectory
-                while not terminated and not truncated:
-                    i += 1
-                    ep_states.append(state)         # add state to ep_states list
+                with self._PROFILER.phase('trajectories'):
+                    # gather trajectory
+                    while not terminated and not truncated:
+                        i += 1
+                        ep_states.append(state)         # add state to ep_states list
                     
-                    action_probs = self.get_action_probabilities(environment, state, policy) # pass state thru policy to get action_probs
-                    ep_probs.append(action_probs)   # add action probabilities to action_probs list
+                        action_probs = self.get_action_probabilities(environment, state, policy) # pass state thru policy to get action_probs
+                        ep_probs.append(action_probs)   # add action probabilities to action_probs list
                     
-                    action = np.random.choice(np.array([0, 1, 2, 3]), p=action_probs)   # choose an action
-                    ep_actions.append(action)       # add action to ep_actions list
+                        action = self.sample_action(action_probs, rng)   # choose an action
+                        ep_actions.append(action)       # add action to ep_actions list
                     
-                    state, reward, terminated, truncated, __ = environment.step(action) # take step in environment
-                    ep_rewards.append(reward)       # add reward to ep_rewards list
+                        state, reward, terminated, truncated, __ = environment.step(action) # take step in environment
+                        ep_rewards.append(reward)       # add reward to ep_rewards list
                     
-                    total_ep_rewards += reward
+                        total_ep_rewards += reward
 
                 ep_returns = self.calculate_return(ep_rewards) # calculate episode return & add total episode reward to totalReward
-                total_reward.append(sum(ep_rewards))
+                total_reward[episode] = sum(ep_rewards)
+                cumulative_total_reward += total_reward[episode]
                 
-                steps_taken.append((i, sum(total_reward)))
+                steps_taken[episode] = (i, cumulative_total_reward)
 
                 # update policy
-                policy = self.update_policy(policy, ep_states, ep_actions, ep_probs, ep_returns, environment)
-
-        environment.close()
-
+                with self._PROFILER.phase('policy_updates'):
+                    policy = self.update_policy(policy, ep_states, ep_actions, ep_probs, ep_returns, environment)
+                
+                episodes_trained = episode+1
+                
+                # check convergence
+                if self._EARLY_STOPPING.is_window_end(episode):
+                    converged = self._EARLY_STOPPING.get_converged(total_reward[np.newaxis], episode, policy[np.newaxis], previous_policy[np.newaxis],
+                        np.array(ep_states)[np.newaxis], np.ones((1, len(ep_states)), dtype=bool))
+                    previous_policy = policy.copy()
+                    if converged[0]:
+                        logging.debug(f'Converged after {episode+1} episodes')
+                
+                if save_checkpoint is not None and (episodes_trained % self._CHECKPOINT_EVERY == 0 or episodes_trained == max_episodes or converged[0]):
+                    save_checkpoint(episodes_trained, {'policy': policy, 'previous_policy': previous_policy, 'total_reward': total_reward[:episodes_trained],
+                        'steps_taken': steps_taken[:episodes_trained], 'converged': converged, **self.get_snapshot_arrays(snapshot_policies)})
+            
+            self._PROFILER.count('episodes', episodes_trained - first_episode)
+            self._PROFILER.count('steps', int(steps_taken[first_episode:episodes_trained, 0].sum()))
+            
+            if converged[0] and episodes_trained < max_episodes:
+                self._PROFILER.count('early_stops')
+                self._EARLY_STOPPING.fill(total_reward[np.newaxis], steps_taken[np.newaxis, :, 0], np.array([episodes_trained]))
+                steps_taken[:, 1] = np.cumsum(total_reward)
+        
+        if snapshots is None:
+            return self.get_result(total_reward, steps_taken, policy)
+        
+        # the policy after a budget the agent has not trained for (random, converged before) is its final policy
+        return [self.get_result(total_reward[:budget], steps_taken[:budget], policy if snapshot_policies[budget] is None else snapshot_policies[budget])
+            for budget in snapshots]
+    
+    def get_result(self, total_reward, steps_taken, policy):
         # success rate
-        success_rate = (sum(total_reward) / max_episodes) * 100
+        success_rate = (sum(total_reward) / len(total_reward)) * 100
 
         # cumulative reward
         cumulative_reward = np.cumsum(total_reward)
@@ -235,20 +438,337 @@ class Runner():
         logging.debug(final_policy)
 
         return success_rate, steps_taken, cumulative_reward, final_policy
+    
+    def get_checkpoint_snapshots(self, checkpoint, snapshot_policies):
+        return {budget: checkpoint.arrays[f'snapshot_{budget}'] for budget in snapshot_policies if f'snapshot_{budget}' in checkpoint.arrays}
+    
+    def get_snapshot_arrays(self, snapshot_policies):
+        return {f'snapshot_{budget}': snapshot for budget, snapshot in snapshot_policies.items() if snapshot is not None}
 
-    def evaluate(self, max_episodes, advice=None, is_random=False):  
-        success_rates = []
-        steps = []
-        cumulative_rewards = []
-        final_policies = []
-        for i in range(self._NUM_EXPERIMENTS):
-            logging.info(f'\t\t running experiment #{i+1}')
-            success_rate, steps_taken, cumulative_reward, final_policy= self.discrete_policy_grad(max_episodes, advice=advice, is_random=is_random)
-            success_rates.append(success_rate)
-            steps.append(steps_taken)
-            cumulative_rewards.append(cumulative_reward)
-            final_policies.append(final_policy)
-        return success_rates, steps, cumulative_rewards, final_policies
+    def discrete_policy_grad_batch(self, max_episodes, num_agents, advice=None, is_random=False, rng=None, initial_policy=None, checkpoint=None, save_checkpoint=None, snapshots=None):
+        """
+        Trains num_agents agents in lockstep; initial_policy, checkpoint, save_checkpoint and snapshots as in discrete_policy_grad, with a leading agent axis.
+        Random numbers are drawn in a different order than by discrete_policy_grad, so a batch of agents agrees with
+        serial training in distribution, not draw for draw.
+        """
+        rng = rng if rng is not None else np.random.default_rng()
+        snapshot_policies = dict.fromkeys(snapshots if snapshots is not None else [])
+        environment = self.get_environment(rng)
+        num_states, num_actions = environment.num_states, environment.num_actions
+        agents = np.arange(num_agents)
+        
+        if is_random == True:
+            logging.debug('Agent policies are random')
+            policy = np.zeros((num_agents, num_states, num_actions))
+        else:
+            logging.debug('Agent policies are not random')
+            policy = self.get_default_policy(environment)
+            if advice:
+                with self._PROFILER.phase('shaping'):
+                    policy = self.shape_policy(policy, advice)
+            policy = self.policy_to_numerical_preferences(policy, environment)
+            policy = np.repeat(policy[np.newaxis], num_agents, axis=0)
+            if initial_policy is not None:
+                policy = np.array(initial_policy, dtype=float)
+        
+        total_reward = np.zeros((num_agents, max_episodes))
+        episode_lengths = np.zeros((num_agents, max_episodes))
+        discounts = self._GAMMA**np.arange(self._MAX_STEPS)
+        
+        # agents that have converged stop training, the others carry on
+        training = np.ones(num_agents, dtype=bool)
+        stopped_at = np.full(num_agents, max_episodes)
+        previous_policy = policy.copy()
+        first_episode = 0
+        if checkpoint is not None:
+            first_episode = checkpoint.episodes
+            rng.bit_generator.state = checkpoint.rng_state
+            policy, previous_policy = checkpoint.arrays['policy'].copy(), checkpoint.arrays['previous_policy'].copy()
+            total_reward[:, :first_episode] = checkpoint.arrays['total_reward']
+            episode_lengths[:, :first_episode] = checkpoint.arrays['episode_lengths']
+            training = checkpoint.arrays['training'].copy()
+            stopped_at = np.where(training, max_episodes, checkpoint.arrays['stopped_at'])
+            snapshot_policies.update(self.get_checkpoint_snapshots(checkpoint, snapshot_policies))
+        
+        # the policies only change between episodes: action probabilities and their CDFs are kept for every state, and
+        # only recomputed for the states whose preferences an update changed
+        if is_random != True:
+            action_probs, action_cdf = self.get_action_distributions(policy)
+        
+        episodes_trained = first_episode
+        for episode in range(first_episode, max_episodes):
+            if episode in snapshot_policies:
+                snapshot_policies[episode] = policy.copy()
+            if not training.any():
+                break
+            
+            state = np.full(num_agents, environment.start_state)
+            active = training.copy()
+            ep_states = np.zeros((self._MAX_STEPS, num_agents), dtype=int)
+            ep_actions = np.zeros((self._MAX_STEPS, num_agents), dtype=int)
+            ep_rewards = np.zeros((self._MAX_STEPS, num_agents))
+            ep_mask = np.zeros((self._MAX_STEPS, num_agents), dtype=bool)
+            
+            with self._PROFILER.phase('trajectories'):
+                # gather trajectories of all agents in lockstep; finished agents are masked out
+                for t in range(self._MAX_STEPS):
+                    if not active.any():
+                        break
+                    if is_random == True:
+                        action = rng.integers(num_actions, size=num_agents)
+                    else:
+                        # first action whose cumulative probability exceeds the sample, as in sample_action
+                        action = (action_cdf[agents, state] > rng.random(num_agents)[:, np.newaxis]).argmax(axis=1)
+                
+                    ep_states[t] = state
+                    ep_actions[t] = action
+                    ep_mask[t] = active
+                    samples = rng.random(num_agents) if environment.is_slippery else None
+                    next_state, reward, done = environment.step_batch(state, action, samples)
+                    ep_rewards[t] = reward * active
+                
+                    state = np.where(active, next_state, state)
+                    active &= ~done
+            
+            ep_states, ep_actions, ep_rewards, ep_mask = ep_states.T, ep_actions.T, ep_rewards.T, ep_mask.T
+            
+            total_reward[:, episode] = ep_rewards.sum(axis=1)
+            episode_lengths[:, episode] = ep_mask.sum(axis=1)
+            episodes_trained = episode+1
+            
+            if is_random == True:
+                continue
+            
+            # returns of every time step (zero rewards beyond the end of an episode do not contribute)
+            ep_returns = (ep_rewards * discounts)[:, ::-1].cumsum(axis=1)[:, ::-1] / discounts
+            
+            with self._PROFILER.phase('policy_updates'):
+                # update policies
+                agent_index, t_index = np.nonzero(ep_mask)
+                state_index = ep_states[agent_index, t_index]
+                phi = np.zeros((len(agent_index), num_actions))
+                phi[np.arange(len(agent_index)), ep_actions[agent_index, t_index]] = 1
+                score = phi - action_probs[agent_index, state_index]
+                update = self._ALPHA * ep_returns[agent_index, t_index][:, np.newaxis] * score
+                np.add.at(policy, (agent_index, state_index), update)
+                action_probs[agent_index, state_index], action_cdf[agent_index, state_index] = self.get_action_distributions(policy[agent_index, state_index])
+            
+            # check convergence
+            if self._EARLY_STOPPING.is_window_end(episode):
+                converged = training & self._EARLY_STOPPING.get_converged(total_reward, episode, policy, previous_policy, ep_states, ep_mask)
+                previous_policy = policy.copy()
+                stopped_at[converged] = episode+1
+                training &= ~converged
+            
+            if save_checkpoint is not None and (episodes_trained % self._CHECKPOINT_EVERY == 0 or episodes_trained == max_episodes or not training.any()):
+                save_checkpoint(episodes_trained, {'policy': policy, 'previous_policy': previous_policy, 'total_reward': total_reward[:, :episodes_trained],
+                    'episode_lengths': episode_lengths[:, :episodes_trained], 'training': training, 'stopped_at': stopped_at, **self.get_snapshot_arrays(snapshot_policies)})
+        
+        self._PROFILER.count('episodes', int((np.minimum(stopped_at, episodes_trained) - first_episode).clip(0).sum()))
+        self._PROFILER.count('steps', int(episode_lengths[:, first_episode:].sum()))
+        if (stopped_at < max_episodes).any():
+            self._PROFILER.count('early_stops', int((stopped_at < max_episodes).sum()))
+            self._EARLY_STOPPING.fill(total_reward, episode_lengths, stopped_at)
+        
+        if snapshots is None:
+            return self.get_batch_result(total_reward, episode_lengths, policy)
+        
+        return [self.get_batch_result(total_reward[:, :budget], episode_lengths[:, :budget], policy if snapshot_policies[budget] is None else snapshot_policies[budget])
+            for budget in snapshots]
+    
+    def get_batch_result(self, total_reward, episode_lengths, policy):
+        # success rate
+        success_rates = (total_reward.sum(axis=1) / total_reward.shape[1]) * 100
+        
+        # cumulative reward
+        cumulative_rewards = np.cumsum(total_reward, axis=1)
+        
+        # steps per episode and cumulative reward after each episode
+        steps_taken = np.stack([episode_lengths, cumulative_rewards], axis=2)
+        
+        # final policy
+        final_policies = softmax(policy, axis=2)
+        
+        return success_rates, steps_taken, cumulative_rewards, final_policies
+
+    def get_job_seed(self, config_name, repetition=None):
+        # the episode budget is deliberately not part of the seed: longer runs extend shorter ones
+        entropy = [self._RNG_SEED, zlib.crc32(config_name.encode())]
+        if repetition is not None:
+            entropy.append(repetition)
+        
+        return np.random.SeedSequence(entropy)
+    
+    def get_jobs(self, budgets, config, first_repetition=0):
+        budgets = tuple(sorted(budgets))
+        if self._BATCHED:
+            if first_repetition >= self._NUM_EXPERIMENTS:
+                return []
+            return [(budgets, config.advice, config.is_random, self.get_job_seed(config.get_name()), 0, self._NUM_EXPERIMENTS,
+                self.get_checkpoint_file(config), self.get_warm_start_policy(config))]
+        
+        return [(budgets, config.advice, config.is_random, self.get_job_seed(config.get_name(), i), i, None,
+            self.get_checkpoint_file(config, i), self.get_warm_start_policy(config, i)) for i in range(first_repetition, self._NUM_EXPERIMENTS)]
+    
+    def get_checkpoint_file(self, config, repetition=None):
+        # random agents do not learn, there is nothing to checkpoint
+        if self._CHECKPOINT_FOLDER is None or config.is_random:
+            return None
+        
+        return f'{self._CHECKPOINT_FOLDER}/{config.get_name()}/{"batch" if repetition is None else repetition}.npz'
+    
+    def get_warm_start_policy(self, config, repetition=None):
+        """
+        Numerical preferences of the same configuration and repetition in the checkpoints of another experiment, stacked for all
+        repetitions if no repetition is given. Checkpoints of single repetitions and of batches can be used interchangeably.
+        """
+        if self._WARM_START_FOLDER is None or config.is_random:
+            return None
+        
+        batch_checkpoint = Checkpoint.load(f'{self._WARM_START_FOLDER}/{config.get_name()}/batch.npz')
+        policies = []
+        for i in (range(self._NUM_EXPERIMENTS) if repetition is None else [repetition]):
+            checkpoint = Checkpoint.load(f'{self._WARM_START_FOLDER}/{config.get_name()}/{i}.npz')
+            if checkpoint is not None:
+                policies.append(checkpoint.arrays['policy'])
+            elif batch_checkpoint is not None and i < len(batch_checkpoint.arrays['policy']):
+                policies.append(batch_checkpoint.arrays['policy'][i])
+            else:
+                raise Exception(f'No checkpoint of {config.get_name()} #{i+1} to warm start from in {self._WARM_START_FOLDER}')
+        
+        return policies[0] if repetition is not None else np.stack(policies)
+    
+    def get_training_key(self, job):
+        """
+        Key of everything that determines the training of a job, except the episode budget: the state after n episodes is the
+        same for every budget of at least n episodes.
+        """
+        budgets, advice, is_random, job_seed, repetition, num_agents, checkpoint_file, initial_policy = job
+        
+        hyperparameters = [self._ALPHA, self._GAMMA, self._SLIPPERY, self._MAX_STEPS]
+        if self._EARLY_STOPPING.is_enabled():
+            hyperparameters.append(self._EARLY_STOPPING.get_settings())
+        advice_columns = []
+        if advice:
+            advice_table = advice if isinstance(advice, sl.OpinionTable) else sl.OpinionTable.from_advisor_opinions(advice)
+            advice_columns = [advice_table.cells, advice_table.b, advice_table.d, advice_table.u, advice_table.a]
+        
+        initial_policy = [initial_policy] if initial_policy is not None else []
+        
+        return get_content_key(TRAINING_VERSION, self._MAP_DESC, hyperparameters, is_random, job_seed.entropy, num_agents, *advice_columns, *initial_policy)
+    
+    def get_job_keys(self, job):
+        training_key = self.get_training_key(job)
+        
+        return [get_content_key(training_key, max_episodes) for max_episodes in job[0]]
+    
+    def save_checkpoint(self, file_name, key, rng, episodes, arrays):
+        with self._PROFILER.phase('checkpoints'):
+            Checkpoint(key, episodes, rng.bit_generator.state, arrays).save(file_name)
+    
+    def run_job(self, job):
+        """
+        Trains the agents of a job once for the largest of its episode budgets, and returns the results after every budget.
+        """
+        budgets, advice, is_random, job_seed, repetition, num_agents, checkpoint_file, initial_policy = job
+        max_episodes = budgets[-1]
+        
+        if self._CACHE is not None:
+            with self._PROFILER.phase('cache'):
+                keys = self.get_job_keys(job)
+                results = [self._CACHE.load(key) for key in keys]
+            if all(result is not None for result in results):
+                self._PROFILER.count('cache_hits')
+                logging.info(f'\t\t {num_agents} experiments loaded from cache' if num_agents is not None else f'\t\t experiment #{repetition+1} loaded from cache')
+                return results
+        
+        rng = np.random.default_rng(job_seed)
+        
+        checkpoint, save_checkpoint = None, None
+        if checkpoint_file is not None:
+            training_key = self.get_training_key(job)
+            with self._PROFILER.phase('checkpoints'):
+                checkpoint = Checkpoint.load(checkpoint_file, training_key)
+            if checkpoint is not None and (checkpoint.episodes > max_episodes or
+                    any(budget < checkpoint.episodes and f'snapshot_{budget}' not in checkpoint.arrays for budget in budgets)):
+                # a longer training cannot be rewound: train from scratch, and keep the longer checkpoint
+                checkpoint = None
+            else:
+                save_checkpoint = partial(self.save_checkpoint, checkpoint_file, training_key, rng)
+            if checkpoint is not None:
+                logging.info(f'\t\t continuing from the checkpoint after {checkpoint.episodes} episodes')
+        
+        if num_agents is not None:
+            logging.info(f'\t\t running {num_agents} experiments in lockstep')
+            with self._PROFILER.phase('training'):
+                results = self.discrete_policy_grad_batch(max_episodes, num_agents, advice=advice, is_random=is_random, rng=rng,
+                    initial_policy=initial_policy, checkpoint=checkpoint, save_checkpoint=save_checkpoint, snapshots=budgets)
+        else:
+            logging.info(f'\t\t running experiment #{repetition+1}')
+            with self._PROFILER.phase('training'):
+                results = self.discrete_policy_grad(max_episodes, advice=advice, is_random=is_random, rng=rng,
+                    initial_policy=initial_policy, checkpoint=checkpoint, save_checkpoint=save_checkpoint, snapshots=budgets)
+        
+        if self._CACHE is not None:
+            with self._PROFILER.phase('cache'):
+                for key, result in zip(keys, results):
+                    self._CACHE.save(key, result)
+        
+        return results
+    
+    def create_pool(self):
+        if self._WORKERS <= 1:
+            return None
+        
+        logging.info(f'Starting a pool of {self._WORKERS} worker processes')
+        return ProcessPoolExecutor(max_workers=self._WORKERS, initializer=init_worker, initargs=(self,))
+    
+    def iterate_configs(self, budgets, configs, first_repetitions=None, pool=None):
+        """
+        Runs every remaining (configuration, repetition) job and yields the results of each repetition as soon as they are
+        available, in order: (configuration index, repetition, episode budget, success rate, steps, cumulative reward, final
+        policy). Every job trains once for the largest budget; the results of smaller budgets are snapshots of that training.
+        """
+        first_repetitions = first_repetitions if first_repetitions is not None else [0]*len(configs)
+        jobs = [(config_index, job) for config_index, config in enumerate(configs) for job in self.get_jobs(budgets, config, first_repetitions[config_index])]
+        
+        if pool is not None:
+            job_results = self.merge_worker_profiles(pool.map(run_worker_job, [job for _, job in jobs]))
+        else:
+            job_results = (self.run_job(job) for _, job in jobs)
+        
+        for (config_index, job), budget_results in zip(jobs, job_results):
+            for budget, job_result in zip(job[0], budget_results):
+                if self._BATCHED:
+                    # a batch always trains every repetition, only the ones not completed yet are passed on
+                    for repetition, result in enumerate(zip(*job_result)):
+                        if repetition >= first_repetitions[config_index]:
+                            yield (config_index, repetition, budget) + result
+                else:
+                    yield (config_index, job[4], budget) + job_result
+    
+    def merge_worker_profiles(self, worker_results):
+        for result, profile in worker_results:
+            self._PROFILER.merge(profile)
+            yield result
+    
+    def evaluate_configs(self, max_episodes, configs, pool=None):
+        results = [([], [], [], []) for config in configs]
+        for config_index, repetition, budget, success_rate, steps_taken, cumulative_reward, final_policy in self.iterate_configs([max_episodes], configs, pool=pool):
+            for result_list, result in zip(results[config_index], [success_rate, steps_taken, cumulative_reward, final_policy]):
+                result_list.append(result)
+        
+        return results
+
+    def evaluate(self, max_episodes, advice=None, is_random=False, config_name='default'):
+        config = ExperimentConfig(config_name, config_name, advice=advice, is_random=is_random)
+        pool = self.create_pool()
+        try:
+            with self._PROFILER.phase('evaluate'):
+                return self.evaluate_configs(max_episodes, [config], pool)[0]
+        finally:
+            if pool is not None:
+                pool.shutdown()
 
     def prepare_folder(self, experiment_name=None):
         logging.info(f'Preparing output folder')
@@ -258,37 +778,19 @@ class Runner():
         
         return complete_folder_name
         
-    def run_experiment_random(self, max_episodes):
-        logging.info(f'====== RANDOM AGENT WITH {max_episodes} EPISODES ======')
-        
-        success_rates, steps, cumulative_rewards, final_policies = self.evaluate(max_episodes, is_random=True)
-        reward_results = cumulative_rewards
-        policy_results = self.preprocess_policy_data(final_policies)
-        
-        return reward_results, policy_results
+    def prepare_experiment_random(self):
+        return ExperimentConfig('random', 'RANDOM AGENT', is_random=True)
             
-    def run_experiment_noadvice(self, max_episodes):
-        logging.info(f'====== NO ADVICE AGENT WITH {max_episodes} EPISODES ======')
-        
-        success_rates, steps, cumulative_rewards, final_policies = self.evaluate(max_episodes)
-        reward_results = cumulative_rewards
-        policy_results = self.preprocess_policy_data(final_policies)
-        
-        return reward_results, policy_results
+    def prepare_experiment_noadvice(self):
+        return ExperimentConfig('noadvice', 'NO ADVICE AGENT')
     
-    def run_experiment_synthetic(self, max_episodes, quota, u):
-        logging.info(f'====== SYNTHETIC-ADVISED AGENT WITH {max_episodes} EPISODES AT u={u} ======')
-        
+    def prepare_experiment_synthetic(self, quota, u):
         advisor_input = self.get_advisor_input(quota)
         assert advisor_input.map_size == self._SIZE #sanity check
         
         synthetic_opinions = SyntheticAdvisorOpinions(advisor_input, u, self._BASERATE)
-  
-        success_rates, steps, cumulative_rewards, final_policies = self.evaluate(max_episodes, advice=synthetic_opinions)
-        reward_results = cumulative_rewards
-        policy_results = self.preprocess_policy_data(final_policies)
         
-        return reward_results, policy_results
+        return ExperimentConfig(f'advice-synthetic-{quota}', f'SYNTHETIC-ADVISED AGENT ({quota}) AT u={u}', advice=synthetic_opinions, file_suffix=('u', u), metadata={'quota': quota, 'u': u})
     
     """
     def run_experiment_realhuman(self, maxepisodes, quota, position):
@@ -313,10 +815,7 @@ class Runner():
     """
 
     
-    def run_experiment_coop(self, max_episodes, quota, advisor1_position, advisor2_position):
-        logging.info(f'====== COOP ADVISED AGENT WITH {max_episodes} EPISODES ======')
-        logging.info(f'QUOTA: {quota} ** ADVISOR1: {advisor1_position} ** ADVISOR2: {advisor2_position}')
-
+    def prepare_experiment_coop(self, quota, advisor1_position, advisor2_position):
         # get advisor 03-input
         advisor1_id = "A1"
         advisor2_id = "A2"
@@ -331,85 +830,158 @@ class Runner():
         advisor2_opinions = HumanAdvisorOpinions(advisor2_input, advisor2_position, self._BASERATE)
 
         #fuse advice
-        fused_opinions = sl.fuse_advisor_opinions(advisor1_opinions, advisor2_opinions)
-
-        success_rates, steps, cumulative_rewards, final_policies = self.evaluate(max_episodes, advice=fused_opinions)
-        reward_results = cumulative_rewards
-        policy_results = self.preprocess_policy_data(final_policies)
+        fused_opinions = sl.fuse_advisor_opinions(advisor1_opinions, advisor2_opinions, operator=self._FUSION_OPERATOR)
         
-        return reward_results, policy_results
+        description = f'COOP ADVISED AGENT (QUOTA: {quota} ** ADVISOR1: {advisor1_position} ** ADVISOR2: {advisor2_position})'
+        
+        metadata = {'quota': quota, 'advisor1_position': advisor1_position, 'advisor2_position': advisor2_position, 'fusion': self._FUSION_OPERATOR}
+        
+        return ExperimentConfig(f'advice-{quota}-{advisor1_position}-{advisor2_position}', description, advice=fused_opinions, metadata=metadata)
+    
+    def prepare_experiments(self, mode):
+        configs = []
+        if mode=='random':
+            configs.append(self.prepare_experiment_random())
+        elif mode=='noadvice':
+            configs.append(self.prepare_experiment_noadvice())
+        elif mode=='synthetic':
+            for quota in ['all', 'holes', 'human10', 'human5']:
+                for u in [0.01, 0.2, 0.4, 0.6, 0.8]:
+                #for u in [0.01]:
+                    configs.append(self.prepare_experiment_synthetic(quota=quota, u=u))
+        elif mode=='realhuman':
+            pass
+            #for quota in ['human10', 'human5']:
+            #    for position in ['topleft', 'bottomright', 'topright', 'bottomleft']:                    
+            #        configs.append(self.prepare_experiment_realhuman(quota=quota, position=position))
+        elif mode=='coop':
+            for quota in ['coop10', 'coop5']:
+                for position in [['topleft', 'bottomright'], ['topright', 'bottomleft']]:   
+                    advisor1_position, advisor2_position =  position[0], position[1]       
+                    configs.append(self.prepare_experiment_coop(quota=quota, advisor1_position=(advisor1_position), advisor2_position=(advisor2_position)))
+        else:
+            raise Exception(f'Unknown mode {mode} selected')
+        
+        return configs
+    
+    def get_resumed_rng_seed(self, complete_folder_name):
+        for root, folders, files in sorted(os.walk(complete_folder_name)):
+            for file in sorted(files):
+                if file.endswith('.json'):
+                    metadata = self._RESULT_STORE.load_metadata(os.path.join(root, file[:-len('.json')]))
+                    if 'rngseed' in metadata:
+                        return metadata['rngseed']
+        
+        return self._RNG_SEED
     
     def run_experiment(self, mode, experiment_name=None):
         complete_folder_name = self.prepare_folder(experiment_name)
+        if self._RESUME and not self._RNG_SEED_GIVEN:
+            self._RNG_SEED = self.get_resumed_rng_seed(complete_folder_name)
+            logging.info(f'Resuming with random seed {self._RNG_SEED}')
+        self._PROFILER.reset()
+        if self._CHECKPOINT_EVERY is not None:
+            self._CHECKPOINT_FOLDER = f'{complete_folder_name}/checkpoints'
+        configs = self.prepare_experiments(mode)
         
-        for max_episodes in self._MAX_EPISODES:
-            reward_data_folder_name = f'{complete_folder_name}/{max_episodes}/reward_data'
-            self.create_folder(reward_data_folder_name)
-            policy_data_folder_name = f'{complete_folder_name}/{max_episodes}/policy_data'
-            self.create_folder(policy_data_folder_name)
-            
-            if mode=='random':
-                reward_results, policy_results = self.run_experiment_random(max_episodes)
-                self.save_experiment_data(reward_results, reward_data_folder_name, 'random')
-                self.save_experiment_data(policy_results, policy_data_folder_name, 'random')
-            elif mode=='noadvice':
-                reward_results, policy_results = self.run_experiment_noadvice(max_episodes)
-                self.save_experiment_data(reward_results, reward_data_folder_name, 'noadvice')
-                self.save_experiment_data(policy_results, policy_data_folder_name, 'noadvice')
-            elif mode=='synthetic':
-                for quota in ['all', 'holes', 'human10', 'human5']:
-                    for u in [0.01, 0.2, 0.4, 0.6, 0.8]:
-                    #for u in [0.01]:
-                        reward_results, policy_results = self.run_experiment_synthetic(max_episodes, quota=quota, u=u)
-                        self.save_experiment_data(reward_results, reward_data_folder_name, f'advice-synthetic-{quota}', file_suffix = ('u', u))
-                        self.save_experiment_data(policy_results, policy_data_folder_name, f'advice-synthetic-{quota}', file_suffix = ('u', u))
-            elif mode=='realhuman':
-                pass
-                #for quota in ['human10', 'human5']:
-                #    for position in ['topleft', 'bottomright', 'topright', 'bottomleft']:                    
-                #        reward_results, policy_results = self.run_experiment_realhuman(max_episodes, quota=quota, position=position)
-                #        self.save_experiment_data(reward_results, reward_data_folder_name, f'advice-real-{quota}', file_suffix = ('position', position))
-                #        self.save_experiment_data(policy_results, policy_data_folder_name, f'advice-real-{quota}', file_suffix = ('position', position))
-            elif mode=='coop':
-                for quota in ['coop10', 'coop5']:
-                    for position in [['topleft', 'bottomright'], ['topright', 'bottomleft']]:   
-                        advisor1_position, advisor2_position =  position[0], position[1]       
-                        reward_results, policy_results = self.run_experiment_coop(max_episodes, quota=quota, advisor1_position=(advisor1_position), advisor2_position=(advisor2_position))
-                        self.save_experiment_data(reward_results, reward_data_folder_name, f'advice-{quota}-{advisor1_position}-{advisor2_position}')
-                        self.save_experiment_data(policy_results, policy_data_folder_name, f'advice-{quota}-{advisor1_position}-{advisor2_position}')
-            else:
-                raise Exception(f'Unknown mode {mode} selected')
-            
-            logging.info(f'======EXPERIMENT DONE======\n')
+        pool = self.create_pool()
+        try:
+            # incrementally, all budgets are trained in one pass; otherwise every budget is trained on its own
+            budget_groups = [sorted(set(self._MAX_EPISODES))] if self._INCREMENTAL else [[max_episodes] for max_episodes in self._MAX_EPISODES]
+            for budgets in budget_groups:
+                writers = {}
+                for max_episodes in budgets:
+                    reward_data_folder_name = f'{complete_folder_name}/{max_episodes}/reward_data'
+                    self.create_folder(reward_data_folder_name)
+                    policy_data_folder_name = f'{complete_folder_name}/{max_episodes}/policy_data'
+                    self.create_folder(policy_data_folder_name)
+                    
+                    writers[max_episodes] = []
+                    for config in configs:
+                        logging.info(f'====== {config.description} WITH {max_episodes} EPISODES ======')
+                        metadata = self.get_metadata(mode, max_episodes, config)
+                        reward_writer = self.open_experiment_writer(reward_data_folder_name, config.agent, (self._NUM_EXPERIMENTS, max_episodes), config.file_suffix, dict(metadata, data='reward'))
+                        policy_writer = self.open_experiment_writer(policy_data_folder_name, config.agent, (self._NUM_EXPERIMENTS, (self._SIZE**2) * 4), config.file_suffix, dict(metadata, data='policy'))
+                        if reward_writer.completed > 0:
+                            logging.info(f'\t\t resuming after experiment #{min(reward_writer.completed, policy_writer.completed)}')
+                        writers[max_episodes].append((reward_writer, policy_writer))
+                
+                first_repetitions = [min(min(reward_writer.completed, policy_writer.completed) for reward_writer, policy_writer in config_writers)
+                    for config_writers in zip(*writers.values())]
+                
+                # results are streamed to disk experiment by experiment
+                for config_index, repetition, max_episodes, success_rate, steps_taken, cumulative_reward, final_policy in self.iterate_configs(budgets, configs, first_repetitions, pool):
+                    reward_writer, policy_writer = writers[max_episodes][config_index]
+                    with self._PROFILER.phase('writes'):
+                        if reward_writer.completed == repetition:
+                            reward_writer.write(cumulative_reward)
+                        if policy_writer.completed == repetition:
+                            policy_writer.write(final_policy.reshape(-1))
+                
+                logging.info(f'======EXPERIMENT DONE======\n')
+        finally:
+            if pool is not None:
+                pool.shutdown()
+            if self._CACHE is not None:
+                self._CACHE.evict()
+            if self._PROFILER.enabled:
+                self.save_profile(mode, complete_folder_name)
             
+    def save_profile(self, mode, complete_folder_name):
+        metadata = {
+            'mode': mode,
+            'size': self._SIZE,
+            'seed': self._SEED,
+            'rngseed': self._RNG_SEED,
+            'episodes': self._MAX_EPISODES,
+            'experiments': self._NUM_EXPERIMENTS,
+            'batched': self._BATCHED,
+            'workers': self._WORKERS
+        }
+        file_name = f'{complete_folder_name}/profile.json'
+        self._PROFILER.save(file_name, metadata)
+        logging.info(f'Profile saved to {file_name}')
+    
     def create_folder(self, folder_name):
         folder = os.path.abspath(folder_name)
         if not os.path.exists(folder):
             os.makedirs(folder)
     
-    def save_data(self, data, file_name):
-        np.savetxt(f'{file_name}', data, delimiter=",")
+    def get_metadata(self, mode, max_episodes, config):
+        metadata = {
+            'mode': mode,
+            'agent': config.agent,
+            'size': self._SIZE,
+            'seed': self._SEED,
+            'rngseed': self._RNG_SEED,
+            'episodes': max_episodes,
+            'experiments': self._NUM_EXPERIMENTS,
+            'alpha': self._ALPHA,
+            'gamma': self._GAMMA,
+            'slippery': self._SLIPPERY
+        }
+        if self._EARLY_STOPPING.is_enabled():
+            metadata['early_stopping'] = self._EARLY_STOPPING.get_settings()
+        if self._WARM_START_FROM is not None:
+            metadata['warm_start_from'] = self._WARM_START_FROM
+        metadata.update(config.metadata)
+        
+        return metadata
     
-    def save_experiment_data(self, data, root_folder, agent, file_suffix=None):
+    def get_experiment_file_name(self, root_folder, agent, file_suffix=None):
         folder_name = f'{root_folder}/{agent}'
         self.create_folder(folder_name)
         
         file_name = f'{folder_name}/{self._FILE_PATTERN}'
         if file_suffix is not None:
             file_name = '-'.join([file_name, f'{file_suffix[0]}-{file_suffix[1]}'])
-            
-        file_name = '.'.join([file_name, 'csv'])
         
-        self.save_data(data, file_name)
-
-    def preprocess_policy_data(self, policies_list):
-        policies_arr = np.empty(((len(policies_list)), (self._SIZE**2) * 4)) # maybe find better way to set this 
-
-        for i in range(len(policies_list)):
-            policy = policies_list[i].reshape((policies_list[i].size))
-            policies_arr[i] = policy
+        return file_name
+    
+    def open_experiment_writer(self, root_folder, agent, shape, file_suffix=None, metadata=None):
+        file_name = self.get_experiment_file_name(root_folder, agent, file_suffix)
         
-        return policies_arr
+        return self._RESULT_STORE.open_writer(file_name, shape, metadata, resume=self._RESUME, summary=self._SUMMARY)
 
 if __name__ == '__main__':
     parser = argparse.ArgumentParser()
@@ -417,6 +989,40 @@ if __name__ == '__main__':
     parser.add_argument('--mode', required=True, type=str)
     
     parser.add_argument('--name', required=False, type=str)
+    
+    parser.add_argument('--batched', action='store_true', help='Train all experiments of a configuration in lockstep.')
+    
+    parser.add_argument('--workers', default=1, type=int, help='Number of worker processes running experiments in parallel.')
+    
+    parser.add_argument('--rngseed', required=False, type=int, help='Seed from which the seed of every experiment is derived (default: derived from the map).')
+    
+    parser.add_argument('--resume', action='store_true', help='Continue an interrupted experiment (given by --name) after its last completed experiments.')
+    
+    parser.add_argument('--no-cache', action='store_true', help='Neither read nor write the result cache.')
+    
+    parser.add_argument('--cache-size', default=2048, type=int, help='Size limit of the result cache in MB.')
+    
+    parser.add_argument('--no-summary', action='store_true', help='Do not keep the running statistics (mean, variance, quantiles, confidence intervals) of every configuration.')
+    
+    parser.add_argument('--format', default='npy', choices=['npy', 'csv'], help='Format of the result files.')
+    
+    parser.add_argument('--stop-entropy', type=float, help='Stop training once the mean policy entropy (nats) over the states of an episode is at most this value.')
+    
+    parser.add_argument('--stop-plateau', type=float, help='Stop training once the success rate changes by at most this fraction between two windows of episodes.')
+    
+    parser.add_argument('--stop-theta', type=float, help='Stop training once no numerical preference changes by more than this value over a window of episodes.')
+    
+    parser.add_argument('--stop-window', default=100, type=int, help='Number of episodes between two convergence checks.')
+    
+    parser.add_argument('--checkpoint-every', type=int, help='Save the training state of every experiment every N episodes, and continue from it when resuming or running a larger episode budget.')
+    
+    parser.add_argument('--incremental', action='store_true', help='Train every experiment once for the largest episode budget, and take the results of the smaller budgets from snapshots of that training.')
+    
+    parser.add_argument('--warm-start-from', type=str, help='Initialize the policies from the checkpoints of another experiment (given by its name).')
+    
+    parser.add_argument('--profile', action='store_true', help='Record the time spent in every phase and write it to profile.json in the experiment folder.')
+    
+    parser.add_argument('--fusion', default='bcf', choices=sl.fusion_operators.keys(), help='Operator fusing the opinions of cooperating advisors.')
 
     parser.add_argument(
         "-log",
@@ -448,7 +1054,10 @@ if __name__ == '__main__':
     if options.name is not None:
         experiment_name = options.name.lower()
         
-    runner = Runner(size, seed, numexperiments, maxepisodes, level)
+    early_stopping = EarlyStopping(options.stop_window, entropy=options.stop_entropy, plateau=options.stop_plateau, theta=options.stop_theta)
+    
+    runner = Runner(size, seed, numexperiments, maxepisodes, level, batched=options.batched, workers=options.workers, rngseed=options.rngseed, fusion_operator=options.fusion, result_format=options.format, resume=options.resume, cache=not options.no_cache, cache_size=options.cache_size, profile=options.profile, early_stopping=early_stopping,
+        checkpoint_every=options.checkpoint_every, incremental=options.incremental, summary=not options.no_summary, warm_start_from=options.warm_start_from.lower() if options.warm_start_from else None)
     
     mode = options.mode.lower()
     if mode not in ['random', 'noadvice', 'synthetic', 'human', 'coop']:
@@ -1,7 +1,7 @@
 # Subjective logic module
 
 import numpy as np
-from model import AdvisorOpinions, Opinion, Cell
+from model import AdvisorOpinions, Opinion, Cell, OPINION_TOLERANCE, validate_opinion_components
 
 '''
 Belief constraint fusion for two matrices with the same dimensions
@@ -19,35 +19,183 @@ def beliefConstraintFusion(opinion1: Opinion, opinion2: Opinion):
     d = 1 - (b + u)
     a = (a1 * (1 - u1) + a2 * (1 - u2)) / (2 - u1 - u2)
 
-    fused_opinion = Opinion(cell = opinion1.cell, b = b, d = d, u = u, a = a)
+    fused_opinion = Opinion(cell = opinion1.cell, b = b, d = d, u = u, a = a, validate = False)
     
     return fused_opinion
     
 def probability_to_opinion(cell: Cell, probability, uncertainty = 0):
-    opinion = Opinion(cell, b=probability, d=1-probability, u=uncertainty, a=probability)
+    opinion = Opinion(cell, b=probability, d=1-probability, u=uncertainty, a=probability, validate=False)
     return opinion
     
 def opinion_to_probability(opinion: Opinion):
     return opinion.b + opinion.a * opinion.u
 
-def fuse_advisor_opinions(advisor1_opinions: AdvisorOpinions, advisor2_opinions: AdvisorOpinions):
-    advisor1_opinion_list = advisor1_opinions.opinion_list.copy()
-    advisor2_opinion_list = advisor2_opinions.opinion_list.copy()
-    fused_opinions_list = []
-    for opinion1 in advisor1_opinion_list:
-        for opinion2 in advisor2_opinion_list:
-            if opinion1.cell == opinion2.cell:
-                # fuse opinions
-                fused_opinions_list.append(beliefConstraintFusion(opinion1, opinion2))
-                # remove from orginal lists
-                advisor1_opinion_list.remove(opinion1)
-                advisor2_opinion_list.remove(opinion2)
+'''
+Columnar table of opinions: the sequence numbers of the cells and the b, d, u, a components as NumPy arrays
+'''
+class OpinionTable():
+
+    def __init__(self, cells, b, d, u, a, edge_size: int):
+        self.cells = np.asarray(cells, dtype=int)
+        self.b = np.asarray(b, dtype=float)
+        self.d = np.asarray(d, dtype=float)
+        self.u = np.asarray(u, dtype=float)
+        self.a = np.asarray(a, dtype=float)
+        self.edge_size = edge_size
+
+    def __len__(self):
+        return len(self.cells)
+
+    def __str__(self):
+        return f'Opinion table with {len(self)} opinions.'
+
+    @classmethod
+    def from_advisor_opinions(cls, advisor_opinions: AdvisorOpinions, edge_size: int = None):
+        opinion_list = advisor_opinions.opinion_list
+        if edge_size is None:
+            edge_size = opinion_list[0].cell.edge_size if opinion_list else 0
+        cells = [opinion.cell.get_sequence_number_in_grid() for opinion in opinion_list]
+        b, d, u, a = np.array([opinion.opinion_tuple for opinion in opinion_list], dtype=float).reshape(-1, 4).T
+
+        return cls(cells, b, d, u, a, edge_size)
+
+    @classmethod
+    def from_probabilities(cls, cells, probabilities, edge_size: int, uncertainty = 0):
+        probabilities = np.asarray(probabilities, dtype=float)
+        u = np.full_like(probabilities, uncertainty)
+
+        return cls(cells, probabilities, 1-probabilities, u, probabilities, edge_size)
+
+    def validate(self, tolerance: float = OPINION_TOLERANCE):
+        validate_opinion_components(self.b, self.d, self.u, self.a, tolerance=tolerance)
+
+    def to_advisor_opinions(self):
+        self.validate()
+        rows, cols = np.divmod(self.cells, self.edge_size)
+        advisor_opinions = AdvisorOpinions()
+        advisor_opinions.opinion_list = [Opinion(Cell(int(row), int(col), self.edge_size), b, d, u, a, validate=False)
+            for row, col, b, d, u, a in zip(rows, cols, self.b.tolist(), self.d.tolist(), self.u.tolist(), self.a.tolist())]
+
+        return advisor_opinions
+
+    def take(self, index):
+        return OpinionTable(self.cells[index], self.b[index], self.d[index], self.u[index], self.a[index], self.edge_size)
+
+'''
+Belief constraint fusion of two opinion tables, row by row
+'''
+def belief_constraint_fusion(table1: OpinionTable, table2: OpinionTable):
+    assert(np.array_equal(table1.cells, table2.cells))
+
+    b1, d1, u1, a1 = table1.b, table1.d, table1.u, table1.a
+    b2, d2, u2, a2 = table2.b, table2.d, table2.u, table2.a
+
+    harmony = b1*b2 + b1*u2 + b2*u1
+    conflict = b1*d2 + b2*d1
+    b = harmony / (1 - conflict)
+    u = u1 * u2 / (1 - conflict)
+    d = 1 - (b + u)
+    a = (a1 * (1 - u1) + a2 * (1 - u2)) / (2 - u1 - u2)
+
+    return OpinionTable(table1.cells, b, d, u, a, table1.edge_size)
+
+'''
+Cumulative (aleatory) fusion of two opinion tables, row by row; dogmatic pairs are averaged
+'''
+def cumulative_fusion(table1: OpinionTable, table2: OpinionTable):
+    assert(np.array_equal(table1.cells, table2.cells))
 
+    b1, u1, a1 = table1.b, table1.u, table1.a
+    b2, u2, a2 = table2.b, table2.u, table2.a
 
-    fused_opinions_list.extend(advisor1_opinion_list)
-    fused_opinions_list.extend(advisor2_opinion_list)
+    dogmatic = (u1 == 0) & (u2 == 0)
+    vacuous = (u1 == 1) & (u2 == 1)
+    kappa = np.where(dogmatic, 1, u1 + u2 - u1*u2)
+    base_rate_denominator = np.where(vacuous, 1, u1 + u2 - 2*u1*u2)
 
-    fused_opinions = AdvisorOpinions()
-    fused_opinions.opinion_list = fused_opinions_list
+    b = np.where(dogmatic, (b1 + b2) / 2, (b1*u2 + b2*u1) / kappa)
+    u = np.where(dogmatic, 0, u1*u2 / kappa)
+    d = 1 - (b + u)
+    a = np.where(vacuous | dogmatic, (a1 + a2) / 2, (a1*u2 + a2*u1 - (a1 + a2)*u1*u2) / base_rate_denominator)
+
+    return OpinionTable(table1.cells, b, d, u, a, table1.edge_size)
+
+'''
+Averaging (epistemic) fusion of two opinion tables, row by row; dogmatic pairs are averaged
+'''
+def averaging_fusion(table1: OpinionTable, table2: OpinionTable):
+    assert(np.array_equal(table1.cells, table2.cells))
+
+    b1, u1, a1 = table1.b, table1.u, table1.a
+    b2, u2, a2 = table2.b, table2.u, table2.a
+
+    dogmatic = (u1 == 0) & (u2 == 0)
+    kappa = np.where(dogmatic, 1, u1 + u2)
+
+    b = np.where(dogmatic, (b1 + b2) / 2, (b1*u2 + b2*u1) / kappa)
+    u = np.where(dogmatic, 0, 2*u1*u2 / kappa)
+    d = 1 - (b + u)
+    a = (a1 + a2) / 2
+
+    return OpinionTable(table1.cells, b, d, u, a, table1.edge_size)
+
+'''
+Projected probability of every opinion in a table
+'''
+def projected_probability(table: OpinionTable):
+    return table.b + table.a * table.u
+
+fusion_operators = {
+    'bcf': belief_constraint_fusion,
+    'cumulative': cumulative_fusion,
+    'averaging': averaging_fusion
+}
+
+'''
+Rank of every entry among the entries with the same value, in order of appearance (e.g., [3, 5, 3] -> [0, 0, 1])
+'''
+def get_occurrences(cells):
+    cells = np.asarray(cells, dtype=int)
+    order = np.argsort(cells, kind='stable')
+    first_occurrence = np.searchsorted(cells[order], cells[order])
+    occurrences = np.empty_like(cells)
+    occurrences[order] = np.arange(len(cells)) - first_occurrence
+
+    return occurrences
+
+'''
+Fusion of any number of opinion tables into one opinion per cell.
+Opinions are joined on the cell sequence number and fused in the order of the tables (and of the rows within a table).
+'''
+def fuse_opinion_tables(tables: list, operator: str = 'bcf'):
+    fuse = fusion_operators[operator]
+    edge_size = tables[0].edge_size
+    num_cells = edge_size**2
+
+    present = np.zeros(num_cells, dtype=bool)
+    fused = OpinionTable(np.arange(num_cells), np.zeros(num_cells), np.zeros(num_cells), np.zeros(num_cells), np.zeros(num_cells), edge_size)
+
+    for table in tables:
+        assert(table.edge_size == edge_size)
+        occurrences = get_occurrences(table.cells)
+        for occurrence in range(occurrences.max()+1 if len(table) else 0):
+            increment = table.take(occurrences == occurrence)
+            known = present[increment.cells]
+
+            fused_known = fuse(fused.take(increment.cells[known]), increment.take(known))
+            new = increment.take(~known)
+            for update in [fused_known, new]:
+                fused.b[update.cells], fused.d[update.cells], fused.u[update.cells], fused.a[update.cells] = update.b, update.d, update.u, update.a
+            present[increment.cells] = True
+
+    return fused.take(present)
+
+'''
+Fusion of the opinions of any number of advisors, e.g., fuse_advisor_opinions(advisor1_opinions, advisor2_opinions, operator='cumulative')
+'''
+def fuse_advisor_opinions(*advisor_opinions: AdvisorOpinions, operator: str = 'bcf'):
+    edge_size = next((opinions.opinion_list[0].cell.edge_size for opinions in advisor_opinions if opinions.opinion_list), 0)
+    tables = [OpinionTable.from_advisor_opinions(opinions, edge_size) for opinions in advisor_opinions]
+    fused_table = fuse_opinion_tables(tables, operator)
 
-    return fused_opinions
\ No newline at end of file
+    return fused_table.to_advisor_opinions()
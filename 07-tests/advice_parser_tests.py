@@ -0,0 +1,61 @@
+import os
+import shutil
+import tempfile
+import unittest
+from src.advice_parser import AdviceParser
+
+
+class AdviceParserTests(unittest.TestCase):
+    
+    def setUp(self):
+        self._parser = AdviceParser()
+        self._folder = tempfile.mkdtemp()
+        for quota, lines in [('all', ['[0,0], +1', '[0,1], -2', '[1,1], +2']), ('holes', ['[0,1], -2', '[1,1], +2'])]:
+            with open(os.path.join(self._folder, f'advice-2x2-seed1-{quota}.txt'), 'w') as file:
+                file.write('\n'.join(['2'] + lines))
+        
+    def tearDown(self):
+        shutil.rmtree(self._folder)
+        del(self._parser)
+
+    def testLoadReadsAdviceIntoArrays(self):
+        advice = self._parser.load(os.path.join(self._folder, 'advice-2x2-seed1-all.txt'))
+        
+        self.assertEqual(advice.map_size, 2)
+        self.assertEqual(advice.rows.tolist(), [0, 0, 1])
+        self.assertEqual(advice.cols.tolist(), [0, 1, 1])
+        self.assertEqual(advice.values.tolist(), [1, -2, 2])
+    
+    def testLoadReadsFilesWithoutComma(self):
+        file = os.path.abspath("07-tests/validinput.txt")
+        
+        with open(file, 'r') as f:
+            expectedNumberOfAdvice = len(f.readlines())-1
+        
+        self.assertEqual(len(self._parser.load(file)), expectedNumberOfAdvice)
+    
+    def testMalformedAdviceRaises(self):
+        file = os.path.join(self._folder, 'advice-2x2-seed1-typo.txt')
+        with open(file, 'w') as f:
+            f.write('\n'.join(['2', '[0,0], +1', '[0;1], -2', '[1,1], +2']))
+        
+        with self.assertRaisesRegex(ValueError, 'line 3'):
+            self._parser.load(file)
+    
+    def testParseMatchesLoad(self):
+        advisor_input = self._parser.parse(os.path.join(self._folder, 'advice-2x2-seed1-all.txt'))
+        
+        self.assertEqual([(a.cell.row, a.cell.col, a.value) for a in advisor_input.advice_list], [(0, 0, 1), (0, 1, -2), (1, 1, 2)])
+    
+    def testLoadDirectoryWithCache(self):
+        advice = self._parser.load_directory(self._folder, 2, 1, cache=True)
+        cached_advice = self._parser.load_directory(self._folder, 2, 1, cache=True)
+        
+        self.assertEqual(sorted(advice.keys()), ['all', 'holes'])
+        self.assertTrue(os.path.exists(os.path.join(self._folder, '.advice-cache', 'advice-2x2-seed1.npz')))
+        for quota in advice:
+            self.assertEqual(cached_advice[quota].map_size, advice[quota].map_size)
+            self.assertEqual(cached_advice[quota].values.tolist(), advice[quota].values.tolist())
+        
+if __name__ == "__main__":
+    unittest.main()
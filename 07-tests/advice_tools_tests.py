@@ -0,0 +1,42 @@
+import filecmp
+import os
+import shutil
+import tempfile
+import unittest
+from src.advice_tools import generate_advice_files
+
+REPOSITORY_PATH = os.path.join(os.path.dirname(os.path.realpath(__file__)), '..')
+
+
+class AdviceToolsTests(unittest.TestCase):
+
+    def setUp(self):
+        # advice is generated from ./02-maps, so every test runs in a temporary working folder
+        self._folder = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self._folder)
+        self.addCleanup(os.chdir, os.getcwd())
+        os.chdir(self._folder)
+        os.makedirs('02-maps')
+
+    def assertRegeneratesCommittedAdvice(self, size, seed, strategy_names, committed_folder):
+        shutil.copy(os.path.join(REPOSITORY_PATH, committed_folder, f'lake-{size}x{size}-seed{seed}.xlsx'), '02-maps')
+
+        generate_advice_files([size], [seed], strategy_names)
+
+        for strategy_name in strategy_names:
+            file_name = f'advice-{size}x{size}-seed{seed}-{strategy_name}.txt'
+            self.assertTrue(filecmp.cmp(os.path.join('02-maps', file_name), os.path.join(REPOSITORY_PATH, committed_folder, file_name), shallow=False))
+
+    def testRegeneratesCommittedAdviceOf12x12Map(self):
+        self.assertRegeneratesCommittedAdvice(12, 63, ['all', 'holes'], '03-input')
+
+    def testRegeneratesCommittedAdviceOf5x5Map(self):
+        self.assertRegeneratesCommittedAdvice(5, 2, ['all'], '02-maps')
+
+    def testInvalidStrategyIsRejected(self):
+        with self.assertRaises(Exception):
+            generate_advice_files([5], [2], ['all', 'most'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,33 @@
+import logging
+import unittest
+import numpy as np
+from src.runner import Runner
+from .runner_test_case import RunnerTestCase
+
+
+class BatchedTrainingTests(RunnerTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self._runner = Runner(4, 1, 4, [50], logging.WARNING, cache=False)
+
+    def testRecordedResult(self):
+        success_rates, steps_taken, cumulative_rewards, final_policies = self._runner.discrete_policy_grad_batch(50, 4, rng=np.random.default_rng(1))
+
+        self.assertEqual(cumulative_rewards[:, -1].tolist(), [0.0, 10.0, 4.0, 0.0])
+        self.assertEqual(steps_taken[:, :, 0].sum(axis=1).tolist(), [389.0, 1943.0, 379.0, 367.0])
+        self.assertEqual(success_rates.tolist(), [0.0, 20.0, 8.0, 0.0])
+        self.assertTrue(np.allclose(final_policies.sum(axis=2), 1))
+
+    def testRewardsMatchTheSerialTrainer(self):
+        # batched and serial training draw their random numbers in a different order, so their results agree in distribution
+        batched = self._runner.discrete_policy_grad_batch(40, 100, rng=np.random.default_rng(2))[2][:, -1]
+        serial = np.array([self._runner.discrete_policy_grad(40, rng=np.random.default_rng(1000+i))[2][-1] for i in range(100)])
+
+        standard_error = np.sqrt(batched.var(ddof=1)/len(batched) + serial.var(ddof=1)/len(serial))
+        self.assertLess(abs(batched.mean() - serial.mean()), 4*standard_error)
+        self.assertGreater(batched.mean(), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,131 @@
+import logging
+import os
+import unittest
+from unittest import mock
+import numpy as np
+from src.cache import ResultCache
+from src.runner import Runner, EarlyStopping
+from .runner_test_case import RunnerTestCase
+
+
+class ResultCacheTests(RunnerTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self._cache = ResultCache('cache')
+        self._result = (12.5, np.arange(6).reshape(2, 3), np.ones(4))
+
+    def assertSameResult(self, result, expected_result):
+        self.assertEqual(len(result), len(expected_result))
+        for value, expected_value in zip(result, expected_result):
+            self.assertTrue(np.array_equal(value, expected_value))
+
+    def set_last_use(self, key, time):
+        os.utime(self._cache.get_file_name(key), (time, time))
+
+    def testSavedResultIsLoaded(self):
+        key = self._cache.get_key('result')
+        self._cache.save(key, self._result)
+
+        result = self._cache.load(key)
+
+        self.assertSameResult(result, self._result)
+        self.assertIsInstance(result[0], float)
+
+    def testMissingOrUnreadableEntryIsAMiss(self):
+        key = self._cache.get_key('result')
+        self.assertIsNone(self._cache.load(key))
+
+        with open(self._cache.get_file_name(key), 'w') as file:
+            file.write('not an entry')
+        with self.assertLogs(level='WARNING'):
+            self.assertIsNone(self._cache.load(key))
+
+    def testSaveLeavesNoTemporaryFiles(self):
+        self._cache.save(self._cache.get_key('result'), self._result)
+
+        self.assertEqual([file for file in os.listdir('cache') if not file.endswith('.npz')], [])
+
+    def testInterruptedSaveKeepsThePreviousEntry(self):
+        key = self._cache.get_key('result')
+        self._cache.save(key, self._result)
+
+        with mock.patch('numpy.savez', side_effect=KeyboardInterrupt):
+            with self.assertRaises(KeyboardInterrupt):
+                self._cache.save(key, (0.0, np.zeros(2), np.zeros(2)))
+
+        self.assertSameResult(self._cache.load(key), self._result)
+
+    def testLeastRecentlyUsedEntriesAreEvicted(self):
+        keys = [self._cache.get_key('result', i) for i in range(4)]
+        for i, key in enumerate(keys):
+            self._cache.save(key, self._result)
+            self.set_last_use(key, 1000 + i)
+        entry_size = os.path.getsize(self._cache.get_file_name(keys[0]))
+
+        # loading marks the oldest entry as the most recently used
+        self._cache.load(keys[0])
+        ResultCache('cache', max_size_mb=2.5*entry_size / (1024*1024)).evict()
+
+        self.assertEqual([os.path.exists(self._cache.get_file_name(key)) for key in keys], [True, False, False, True])
+
+    def testEntriesWithinTheSizeLimitAreKept(self):
+        keys = [self._cache.get_key('result', i) for i in range(4)]
+        for key in keys:
+            self._cache.save(key, self._result)
+
+        self._cache.evict()
+
+        self.assertTrue(all(os.path.exists(self._cache.get_file_name(key)) for key in keys))
+
+
+class ResultCacheKeyTests(RunnerTestCase):
+
+    def get_keys(self, budgets=[20], rngseed=None, early_stopping=None, batched=False, mode='noadvice'):
+        runner = Runner(4, 1, 2, budgets, logging.WARNING, batched=batched, rngseed=rngseed, early_stopping=early_stopping)
+        config = runner.prepare_experiments(mode)[0]
+
+        return [key for job in runner.get_jobs(budgets, config) for key in runner.get_job_keys(job)]
+
+    def testSameTrainingHasTheSameKeys(self):
+        self.assertEqual(self.get_keys(), self.get_keys())
+        self.assertEqual(len(set(self.get_keys())), 2)
+
+    def testKeysChangeWithTheTrainingVersion(self):
+        keys = self.get_keys()
+        with mock.patch('src.runner.TRAINING_VERSION', -1):
+            self.assertNotEqual(self.get_keys(), keys)
+
+    def testKeysChangeWithTheConfiguration(self):
+        keys = self.get_keys()
+        self.assertNotEqual(self.get_keys(mode='random'), keys)
+        self.assertNotEqual(self.get_keys(early_stopping=EarlyStopping(window=10, plateau=0.5)), keys)
+        self.assertNotEqual(self.get_keys(batched=True), keys[:1])
+
+    def testKeysChangeWithTheSeed(self):
+        self.assertNotEqual(self.get_keys(rngseed=1), self.get_keys(rngseed=2))
+
+    def testKeysChangeWithTheBudget(self):
+        keys = self.get_keys([20])
+        self.assertTrue(set(self.get_keys([40])).isdisjoint(keys))
+        # the key of a budget does not depend on the other budgets trained along with it
+        self.assertEqual(self.get_keys([20, 40])[::2], keys)
+
+    def testCachedResultsAreReusedUntilTheKeyChanges(self):
+        Runner(4, 1, 2, [20], logging.WARNING).run_experiment('noadvice', 'first')
+
+        runner = Runner(4, 1, 2, [20], logging.WARNING)
+        with self.assertLogs(level='INFO') as logs:
+            runner.run_experiment('noadvice', 'second')
+        self.assertEqual(sum('loaded from cache' in message for message in logs.output), 2)
+        for results, cached_results in zip(self.get_results('first', 20), self.get_results('second', 20)):
+            self.assertTrue(np.array_equal(results, cached_results))
+
+        runner = Runner(4, 1, 2, [20], logging.WARNING, rngseed=2)
+        with self.assertLogs(level='INFO') as logs:
+            runner.run_experiment('noadvice', 'third')
+        self.assertFalse(any('loaded from cache' in message for message in logs.output))
+
+
+if __name__ == '__main__':
+    unittest.main()
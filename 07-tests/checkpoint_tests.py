@@ -0,0 +1,68 @@
+import logging
+import os
+import unittest
+import numpy as np
+from src.checkpoints import Checkpoint
+from src.runner import Runner, EarlyStopping
+from .runner_test_case import RunnerTestCase
+
+
+class CheckpointTests(RunnerTestCase):
+    
+    def setUp(self):
+        super().setUp()
+        self._file_name = os.path.join(self._folder, 'config', '0.npz')
+        self._rng = np.random.default_rng(1)
+    
+    def get_runner(self, episodes, batched, checkpoint_every=None):
+        return Runner(4, 1, 4, [episodes], logging.WARNING, batched=batched, cache=False,
+            early_stopping=EarlyStopping(window=10, plateau=0.5), checkpoint_every=checkpoint_every)
+
+    def testSaveAndLoad(self):
+        policy = self._rng.random((16, 4))
+        Checkpoint('key', 20, self._rng.bit_generator.state, {'policy': policy}).save(self._file_name)
+        
+        checkpoint = Checkpoint.load(self._file_name, 'key')
+        
+        self.assertEqual(checkpoint.episodes, 20)
+        self.assertTrue(np.array_equal(checkpoint.arrays['policy'], policy))
+    
+    def testRestoredGeneratorContinuesTheSequence(self):
+        Checkpoint('key', 20, self._rng.bit_generator.state, {}).save(self._file_name)
+        expected = self._rng.random(5)
+        
+        rng = np.random.default_rng()
+        rng.bit_generator.state = Checkpoint.load(self._file_name).rng_state
+        
+        self.assertTrue(np.array_equal(rng.random(5), expected))
+    
+    def testCheckpointOfAnotherTrainingIsIgnored(self):
+        Checkpoint('key', 20, self._rng.bit_generator.state, {}).save(self._file_name)
+        
+        self.assertIsNone(Checkpoint.load(self._file_name, 'other key'))
+    
+    def testMissingOrUnreadableCheckpointIsIgnored(self):
+        self.assertIsNone(Checkpoint.load(self._file_name))
+        
+        os.makedirs(os.path.dirname(self._file_name))
+        with open(self._file_name, 'w') as file:
+            file.write('not a checkpoint')
+        
+        self.assertIsNone(Checkpoint.load(self._file_name))
+
+    def testLargerBudgetContinuesFromTheCheckpoint(self):
+        for batched in [False, True]:
+            with self.subTest(batched=batched):
+                self.get_runner(20, batched, checkpoint_every=10).run_experiment('noadvice', f'continued-{batched}')
+                runner = self.get_runner(40, batched, checkpoint_every=10)
+                with self.assertLogs(level='INFO') as logs:
+                    runner.run_experiment('noadvice', f'continued-{batched}')
+                self.get_runner(40, batched).run_experiment('noadvice', f'straight-{batched}')
+                
+                self.assertTrue(any('continuing from the checkpoint after 20 episodes' in message for message in logs.output))
+                for continued, straight in zip(self.get_results(f'continued-{batched}', 40), self.get_results(f'straight-{batched}', 40)):
+                    self.assertTrue(np.array_equal(continued, straight))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,62 @@
+import unittest
+import numpy as np
+from src.runner import EarlyStopping
+
+
+class EarlyStoppingTests(unittest.TestCase):
+    
+    def setUp(self):
+        self._theta = np.zeros((2, 4, 4))
+        self._ep_states = np.zeros((2, 3), dtype=int)
+        self._ep_mask = np.ones((2, 3), dtype=bool)
+        
+    def tearDown(self):
+        del(self._theta)
+        del(self._ep_states)
+        del(self._ep_mask)
+
+    def testDisabledByDefault(self):
+        early_stopping = EarlyStopping()
+        
+        self.assertFalse(early_stopping.is_enabled())
+        self.assertFalse(early_stopping.is_window_end(99))
+    
+    def testPlateauRequiresReachingTheGoal(self):
+        early_stopping = EarlyStopping(window=10, plateau=0.0)
+        total_reward = np.zeros((2, 20))
+        total_reward[1] = 1
+        
+        converged = early_stopping.get_converged(total_reward, 19, self._theta, self._theta, self._ep_states, self._ep_mask)
+        
+        self.assertEqual(converged.tolist(), [False, True])
+    
+    def testNoConvergenceBeforeTwoWindows(self):
+        early_stopping = EarlyStopping(window=10, theta=1.0)
+        total_reward = np.ones((2, 20))
+        
+        self.assertFalse(early_stopping.get_converged(total_reward, 9, self._theta, self._theta, self._ep_states, self._ep_mask).any())
+        self.assertTrue(early_stopping.get_converged(total_reward, 19, self._theta, self._theta, self._ep_states, self._ep_mask).all())
+    
+    def testEntropyOfUniformPolicyIsNotConverged(self):
+        early_stopping = EarlyStopping(window=10, entropy=1.0)
+        total_reward = np.ones((2, 20))
+        theta = self._theta.copy()
+        theta[1, 0, 2] = 100
+        
+        converged = early_stopping.get_converged(total_reward, 19, theta, theta, self._ep_states, self._ep_mask)
+        
+        self.assertEqual(converged.tolist(), [False, True])
+    
+    def testFillExtrapolatesTheLastWindow(self):
+        early_stopping = EarlyStopping(window=2, plateau=0.0)
+        total_reward = np.array([[0, 1, 1, 0, 0, 0], [1, 1, 1, 1, 1, 1]], dtype=float)
+        episode_lengths = np.array([[5, 4, 6, 0, 0, 0], [3, 3, 3, 3, 3, 3]], dtype=float)
+        
+        early_stopping.fill(total_reward, episode_lengths, np.array([3, 6]))
+        
+        self.assertEqual(total_reward[0].tolist(), [0, 1, 1, 1, 1, 1])
+        self.assertEqual(episode_lengths[0].tolist(), [5, 4, 6, 5, 5, 5])
+        self.assertEqual(total_reward[1].tolist(), [1]*6)
+        
+if __name__ == "__main__":
+    unittest.main()
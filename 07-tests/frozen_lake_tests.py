@@ -0,0 +1,106 @@
+import importlib.util
+import os
+import unittest
+import numpy as np
+from src.frozen_lake import FrozenLake
+
+GYMNASIUM_AVAILABLE = importlib.util.find_spec('gymnasium') is not None
+
+
+class FrozenLakeTests(unittest.TestCase):
+    
+    def setUp(self):
+        self._map_desc = ["SFFF", "FHFH", "FFFH", "HFFG"]
+        self._environment = FrozenLake(self._map_desc)
+        
+    def tearDown(self):
+        del(self._map_desc)
+        del(self._environment)
+
+    def testResetReturnsStartState(self):
+        state, info = self._environment.reset(seed=0)
+        self.assertEqual(state, 0)
+    
+    def testMovingOffTheGridKeepsTheAgentInPlace(self):
+        self._environment.reset(seed=0)
+        state, reward, terminated, truncated, info = self._environment.step(0) # LEFT
+        self.assertEqual(state, 0)
+        self.assertFalse(terminated)
+        
+    def testFallingIntoHoleTerminatesWithoutReward(self):
+        self._environment.reset(seed=0)
+        self._environment.step(1) # DOWN to (1,0)
+        state, reward, terminated, truncated, info = self._environment.step(2) # RIGHT into the hole at (1,1)
+        self.assertEqual(state, 5)
+        self.assertEqual(reward, 0)
+        self.assertTrue(terminated)
+        
+    def testReachingGoalTerminatesWithReward(self):
+        self._environment.reset(seed=0)
+        for action in [1, 1, 2, 2, 1, 2]:
+            state, reward, terminated, truncated, info = self._environment.step(action)
+        self.assertEqual(state, 15)
+        self.assertEqual(reward, 1)
+        self.assertTrue(terminated)
+        
+    def testEpisodeIsTruncatedAtTimeLimit(self):
+        environment = FrozenLake(self._map_desc, max_episode_steps=3)
+        environment.reset(seed=0)
+        truncated = [environment.step(3)[3] for _ in range(3)] # UP keeps the agent in place
+        self.assertEqual(truncated, [False, False, True])
+        
+    def testSlipperyTransitionProbabilitiesSumToOne(self):
+        environment = FrozenLake(self._map_desc, is_slippery=True)
+        self.assertEqual(environment.transition_probs.shape, (16, 4, 3))
+        self.assertAlmostEqual(environment.transition_probs.sum(axis=2).min(), 1.0)
+        self.assertAlmostEqual(environment.transition_probs.sum(axis=2).max(), 1.0)
+
+    def get_gym_environment(self, is_slippery):
+        import gymnasium as gym
+        return gym.make('FrozenLake-v1', desc=self._map_desc, is_slippery=is_slippery)
+
+    @unittest.skipUnless(GYMNASIUM_AVAILABLE, 'gymnasium is not installed')
+    def testStepMatchesGym(self):
+        for is_slippery in [False, True]:
+            with self.subTest(is_slippery=is_slippery):
+                environment = FrozenLake(self._map_desc, is_slippery=is_slippery)
+                gym_environment = self.get_gym_environment(is_slippery)
+                actions = np.random.default_rng(1).integers(4, size=2000)
+
+                self.assertEqual(environment.reset(seed=2)[0], gym_environment.reset(seed=2)[0])
+                for action in actions:
+                    state, reward, terminated, truncated, info = environment.step(action)
+                    gym_state, gym_reward, gym_terminated, gym_truncated, gym_info = gym_environment.step(action)
+                    self.assertEqual((state, reward, terminated, truncated), (gym_state, gym_reward, gym_terminated, gym_truncated))
+                    if terminated or truncated:
+                        self.assertEqual(environment.reset()[0], gym_environment.reset()[0])
+
+    @unittest.skipUnless(GYMNASIUM_AVAILABLE, 'gymnasium is not installed')
+    def testStepBatchMatchesGym(self):
+        num_agents = 8
+        for is_slippery in [False, True]:
+            with self.subTest(is_slippery=is_slippery):
+                environment = FrozenLake(self._map_desc, is_slippery=is_slippery)
+                gym_environments = [self.get_gym_environment(is_slippery) for _ in range(num_agents)]
+                # generators seeded like the gym environments, which draw one number per reset and per step
+                samplers = [np.random.default_rng(agent) for agent in range(num_agents)]
+                states = np.array([gym_environment.reset(seed=agent)[0] for agent, gym_environment in enumerate(gym_environments)])
+                for sampler in samplers:
+                    sampler.random()
+                rng = np.random.default_rng(1)
+
+                for _ in range(50):
+                    actions = rng.integers(4, size=num_agents)
+                    samples = np.array([sampler.random() for sampler in samplers])
+                    states, rewards, terminals = environment.step_batch(states, actions, samples)
+                    gym_steps = [gym_environment.step(action)[:3] for gym_environment, action in zip(gym_environments, actions)]
+                    self.assertEqual(list(zip(states.tolist(), rewards.tolist(), terminals.tolist())), gym_steps)
+
+                    # agents that finished start over, in both environments
+                    for agent in np.flatnonzero(terminals):
+                        states[agent] = gym_environments[agent].reset()[0]
+                        samplers[agent].random()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -51,6 +51,43 @@ class GridTests(unittest.TestCase):
         self.assertEqual(middle_cell.get_action_to_me_from_neighbor(Direction.DOWN), Direction.UP)
         self.assertEqual(middle_cell.get_action_to_me_from_neighbor(Direction.LEFT), Direction.RIGHT)
         self.assertEqual(middle_cell.get_action_to_me_from_neighbor(Direction.RIGHT), Direction.LEFT)
+    
+    def testTopologyTablesAreSharedAndReadOnly(self):
+        neighbors, inbound_actions = Grid.get_topology(self._size)
+        
+        self.assertIs(Grid(self._size).neighbors, neighbors)
+        self.assertEqual(neighbors.shape, (self._size**2, len(Direction)))
+        self.assertFalse(neighbors.flags.writeable)
+        self.assertFalse(inbound_actions.flags.writeable)
+    
+    def testInboundActionsLeadBackFromTheNeighbor(self):
+        neighbors, inbound_actions = Grid.get_topology(self._size)
+        offsets = {Direction.LEFT: -1, Direction.DOWN: self._size, Direction.RIGHT: 1, Direction.UP: -self._size}
+        
+        for state, direction in zip(*(neighbors >= 0).nonzero()):
+            action = Direction(inbound_actions[state, direction])
+            self.assertEqual(neighbors[state, direction] + offsets[action], state)
+    
+    def testCellQueriesMatchTheTopologyTables(self):
+        neighbors, inbound_actions = Grid.get_topology(self._size)
+        
+        for cell in self._grid.cells:
+            state = cell.get_sequence_number_in_grid()
+            expected_neighbors = [None if neighbor < 0 else list(divmod(int(neighbor), self._size)) for neighbor in neighbors[state]]
+            expected_actions = [None if action < 0 else Direction(action) for action in inbound_actions[state]]
+            
+            self.assertEqual(cell.get_neighbors(), expected_neighbors)
+            self.assertEqual([cell.get_action_to_me_from_neighbor(d) for d in Direction], expected_actions)
+            self.assertEqual(cell.get_actions_to_me_from_all_neighbors(),
+                [(neighbor, action) for neighbor, action in zip(expected_neighbors, expected_actions) if neighbor is not None])
+        
+        # cells outside the grid, such as placeholders, have no neighbors
+        self.assertEqual(Cell(0, 0, 0).get_neighbors(), [None]*len(Direction))
+        self.assertEqual(Cell(self._size, 0, self._size).get_actions_to_me_from_all_neighbors(), [])
+        
+        # returned coordinates are copies, changing them does not change the cell
+        self._grid.cells[0].get_cell_in_direction(Direction.RIGHT)[1] = -1
+        self.assertEqual(self._grid.cells[0].get_cell_in_direction(Direction.RIGHT), [0, 1])
         
     
 if __name__ == "__main__":
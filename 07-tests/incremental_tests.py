@@ -0,0 +1,66 @@
+import logging
+import unittest
+import numpy as np
+from src.checkpoints import Checkpoint
+from src.runner import Runner, EarlyStopping
+from .runner_test_case import RunnerTestCase
+
+
+class IncrementalTests(RunnerTestCase):
+
+    def get_runner(self, budgets, batched=False, incremental=False, checkpoint_every=None, early_stopping=EarlyStopping(window=10, plateau=0.5)):
+        return Runner(4, 1, 4, budgets, logging.WARNING, batched=batched, cache=False, incremental=incremental,
+            early_stopping=early_stopping, checkpoint_every=checkpoint_every)
+
+    def assertSameResults(self, name, other_name, budgets):
+        for episodes in budgets:
+            for results, other_results in zip(self.get_results(name, episodes), self.get_results(other_name, episodes)):
+                self.assertTrue(np.array_equal(results, other_results))
+
+    def testSnapshotsEqualSeparateTraining(self):
+        for batched in [False, True]:
+            with self.subTest(batched=batched):
+                runner = self.get_runner([20, 40], batched)
+                configs = runner.prepare_experiments('noadvice')
+
+                incremental_results = list(runner.iterate_configs([20, 40], configs))
+                separate_results = list(runner.iterate_configs([20], configs)) + list(runner.iterate_configs([40], configs))
+
+                self.assertEqual(len(incremental_results), 8)
+                by_job = {result[:3]: result[3:] for result in separate_results}
+                for result in incremental_results:
+                    for value, separate_value in zip(result[3:], by_job[result[:3]]):
+                        self.assertTrue(np.array_equal(value, separate_value))
+
+    def testCheckpointIsContinuedWithSnapshots(self):
+        self.get_runner([20, 40], incremental=True, checkpoint_every=10).run_experiment('noadvice', 'continued')
+        runner = self.get_runner([20, 60], incremental=True, checkpoint_every=10)
+        with self.assertLogs(level='INFO') as logs:
+            runner.run_experiment('noadvice', 'continued')
+        self.get_runner([20, 60]).run_experiment('noadvice', 'straight')
+
+        self.assertTrue(any('continuing from the checkpoint after 40 episodes' in message for message in logs.output))
+        self.assertSameResults('continued', 'straight', [20, 60])
+
+    def testCheckpointWithoutSnapshotIsDiscarded(self):
+        # without early stopping, every checkpoint is past 20 episodes
+        self.get_runner([40], checkpoint_every=10, early_stopping=EarlyStopping()).run_experiment('noadvice', 'discarded')
+
+        # a checkpoint past the budget cannot be rewound, and is kept
+        runner = self.get_runner([20], checkpoint_every=10, early_stopping=EarlyStopping())
+        with self.assertLogs(level='INFO') as logs:
+            runner.run_experiment('noadvice', 'discarded')
+        self.assertEqual(Checkpoint.load('05-experiments/discarded/checkpoints/noadvice/0.npz').episodes, 40)
+
+        # nor can a checkpoint past a smaller budget of which it has no snapshot
+        runner = self.get_runner([20, 60], incremental=True, checkpoint_every=10, early_stopping=EarlyStopping())
+        with self.assertLogs(level='INFO') as incremental_logs:
+            runner.run_experiment('noadvice', 'discarded')
+        self.get_runner([20, 60], early_stopping=EarlyStopping()).run_experiment('noadvice', 'straight')
+
+        self.assertFalse(any('continuing from the checkpoint' in message for message in logs.output + incremental_logs.output))
+        self.assertSameResults('discarded', 'straight', [20, 60])
+
+
+if __name__ == '__main__':
+    unittest.main()
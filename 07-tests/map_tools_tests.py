@@ -0,0 +1,69 @@
+import os
+import shutil
+import tempfile
+import unittest
+from src.map_tools import MapTools
+
+
+class MapToolsTests(unittest.TestCase):
+
+    def setUp(self):
+        self._folder = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self._folder)
+        self._map_tools = MapTools(self._folder)
+        self._map_desc = ['SFFFF', 'FHFHF', 'FFFHF', 'HFFFF', 'FHFFG']
+
+    def testTextMapRoundTrip(self):
+        self._map_tools.save_map(self._map_desc, 5, 1)
+
+        self.assertEqual(self._map_tools.parse_map(5, 1), self._map_desc)
+
+    def testXlsxMapRoundTrip(self):
+        self._map_tools.save_map(self._map_desc, 5, 1)
+        self._map_tools.export_xlsx(5, 1)
+        os.remove(self._map_tools.get_text_file(5, 1))
+
+        # read from the workbook, then from the cache of parsed workbooks
+        self.assertEqual(self._map_tools.parse_map(5, 1), self._map_desc)
+        self.assertEqual(self._map_tools.parse_map(5, 1), self._map_desc)
+
+        # a changed workbook is parsed again
+        changed_map_desc = ['SFFFF', 'FFFFF', 'FFFFF', 'FFFFF', 'FFFHG']
+        self._map_tools.write_xlsx(changed_map_desc, self._map_tools.get_xlsx_file(5, 1))
+        self.assertEqual(self._map_tools.parse_map(5, 1), changed_map_desc)
+
+        self._map_tools.import_xlsx(5, 1)
+        with open(self._map_tools.get_text_file(5, 1), 'r') as file:
+            self.assertEqual(file.read(), '\n'.join(changed_map_desc))
+
+    def testGeneratedMapsAreSolvable(self):
+        seeds = list(range(20))
+        for size in [3, 4, 8, 12, 32]:
+            with self.subTest(size=size):
+                maps = self._map_tools.generate_map_arrays(size, seeds)
+
+                self.assertEqual(maps.shape, (len(seeds), size, size))
+                self.assertTrue((maps[:, 0, 0] == 'S').all() and (maps[:, -1, -1] == 'G').all())
+                self.assertTrue(((maps == 'H').sum(axis=(1, 2)) == round(size*size*0.2)-2).all())
+                self.assertTrue(all(self._map_tools.is_solvable([''.join(row) for row in map_array]) for map_array in maps))
+
+    def testGenerationIsSeeded(self):
+        self._map_tools.generate_maps([8], [1, 2])
+        maps = [self._map_tools.parse_map(8, seed) for seed in [1, 2]]
+
+        self.assertEqual(maps, [[''.join(row) for row in map_array] for map_array in self._map_tools.generate_map_arrays(8, [1, 2])])
+        self.assertNotEqual(maps[0], maps[1])
+
+    def testUnsolvableMapIsDetected(self):
+        self.assertFalse(self._map_tools.is_solvable(['SFF', 'HHH', 'FFG']))
+        self.assertTrue(self._map_tools.is_solvable(['SFH', 'HFF', 'FHG']))
+
+    def testMapsSmallerThan3x3AreRejected(self):
+        for size in [1, 2]:
+            with self.subTest(size=size):
+                with self.assertRaises(ValueError):
+                    self._map_tools.generate_map_arrays(size, [1])
+
+
+if __name__ == '__main__':
+    unittest.main()
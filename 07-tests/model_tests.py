@@ -1,6 +1,6 @@
 import os
 import unittest
-from src.model import Cell, Opinion
+from src.model import Cell, Opinion, validate_opinion_components
 
 
 class ModelTests(unittest.TestCase):
@@ -23,6 +23,22 @@ class ModelTests(unittest.TestCase):
         
         self.assertAlmostEqual(opinion.b, expectedBelief, delta=0.0001)
         self.assertAlmostEqual(opinion.d, expectedDisbelief, delta=0.0001)
+    
+    def testOpinionValidationAllowsRoundingErrors(self):
+        cell = Cell(0, 0, 2)
+        
+        opinion = Opinion(cell, 0.7, 0.1, 0.2, 0.5)
+        
+        self.assertEqual(opinion.opinion_tuple, (0.7, 0.1, 0.2, 0.5))
+        self.assertRaises(AssertionError, Opinion, cell, 0.7, 0.2, 0.2, 0.5)
+        self.assertRaises(AssertionError, Opinion, cell, 1.2, -0.4, 0.2, 0.5)
+    
+    def testUnvalidatedOpinionsAreValidatedInBatches(self):
+        cell = Cell(0, 0, 2)
+        
+        opinion = Opinion(cell, 0.7, 0.2, 0.2, 0.5, validate=False)
+        
+        self.assertRaises(AssertionError, validate_opinion_components, [0.7, opinion.b], [0.1, opinion.d], [0.2, opinion.u], [0.5, opinion.a])
         
 if __name__ == "__main__":
     unittest.main()
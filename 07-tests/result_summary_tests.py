@@ -0,0 +1,92 @@
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+from src.result_summary import ResultSummary, SUMMARY_QUANTILES
+from src.results_index import ResultIndex
+from src.results_store import ResultStore
+
+
+class ResultSummaryTests(unittest.TestCase):
+    
+    def setUp(self):
+        self._rows = np.cumsum(np.random.default_rng(1).random((30, 50)), axis=1)
+        self._folder = tempfile.mkdtemp()
+        
+    def tearDown(self):
+        shutil.rmtree(self._folder)
+        del(self._rows)
+
+    def testMeanAndStandardDeviation(self):
+        summary = ResultSummary.from_rows(self._rows).get_summary()
+        
+        self.assertEqual(summary['count'], 30)
+        self.assertTrue(np.allclose(summary['mean'], self._rows.mean(axis=0)))
+        self.assertTrue(np.allclose(summary['std'], self._rows.std(axis=0, ddof=1)))
+    
+    def testQuantilesAreExactUpToTheReservoirSize(self):
+        summary = ResultSummary.from_rows(self._rows, reservoir_size=30).get_summary()
+        
+        self.assertTrue(np.allclose(summary['quantiles'], np.quantile(self._rows, SUMMARY_QUANTILES, axis=0)))
+    
+    def testConfidenceIntervalContainsTheMean(self):
+        summary = ResultSummary.from_rows(self._rows).get_summary()
+        
+        self.assertTrue((summary['ci_low'] <= summary['mean']).all())
+        self.assertTrue((summary['mean'] <= summary['ci_high']).all())
+        self.assertTrue((summary['ci_low'] < summary['ci_high'])[1:].all())
+    
+    def testRowByRowEqualsBatch(self):
+        summary = ResultSummary(self._rows.shape[1], reservoir_size=10)
+        for row in self._rows:
+            summary.update(row)
+        batch_summary = ResultSummary.from_rows(self._rows, reservoir_size=10).get_summary()
+        
+        for name, value in summary.get_summary().items():
+            self.assertTrue(np.allclose(value, batch_summary[name]), name)
+    
+    def testWriterSavesTheSummaryOfCompleteResults(self):
+        file_name = os.path.join(self._folder, 'results')
+        writer = ResultStore().open_writer(file_name, self._rows.shape, summary=True)
+        for row in self._rows[:10]:
+            writer.write(row)
+        self.assertIsNone(ResultSummary.load(file_name))
+        
+        # resumed writing rebuilds the summary from the rows written before
+        writer = ResultStore().open_writer(file_name, self._rows.shape, resume=True, summary=True)
+        for row in self._rows[10:]:
+            writer.write(row)
+        summary = ResultSummary.load(file_name)
+        
+        self.assertEqual(summary['count'], 30)
+        self.assertTrue(np.allclose(summary['mean'], self._rows.mean(axis=0)))
+        self.assertTrue(np.allclose(summary['ci_low'], ResultSummary.from_rows(self._rows).get_summary()['ci_low']))
+
+    def testRerunWithoutSummaryRemovesTheOldSummary(self):
+        os.makedirs(os.path.join(self._folder, '100', 'reward_data', 'noadvice'))
+        file_name = os.path.join(self._folder, '100', 'reward_data', 'noadvice', 'results')
+        for value, summary in [(1, True), (5, False)]:
+            writer = ResultStore().open_writer(file_name, self._rows.shape, summary=summary)
+            for row in np.full(self._rows.shape, value):
+                writer.write(row)
+        
+        self.assertIsNone(ResultSummary.load(file_name))
+        index = ResultIndex(self._folder, cache=False)
+        self.assertTrue(np.allclose(index.load_summaries(index.find())[0]['mean'], 5))
+    
+    def testSummaryOfOtherRowsIsRebuilt(self):
+        os.makedirs(os.path.join(self._folder, '100', 'reward_data', 'noadvice'))
+        file_name = os.path.join(self._folder, '100', 'reward_data', 'noadvice', 'results')
+        ResultStore().save(self._rows, file_name)
+        ResultSummary.from_rows(self._rows[:10] + 1).save(file_name)
+        
+        index = ResultIndex(self._folder, cache=False)
+        summary = index.load_summaries(index.find())[0]
+        
+        self.assertEqual(summary['count'], 30)
+        self.assertTrue(np.allclose(summary['mean'], self._rows.mean(axis=0)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,57 @@
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+from src.results_index import ResultIndex
+from src.results_store import ResultStore
+
+
+class ResultIndexTests(unittest.TestCase):
+    
+    def setUp(self):
+        self._folder = tempfile.mkdtemp()
+        self._data = np.arange(12, dtype=float).reshape(3, 4)
+        for agent, name, result_format in [('noadvice', '2x2-seed1', 'npy'), ('advice-synthetic-all', '2x2-seed1-u-0.2', 'csv'), ('advice-synthetic-all', '2x2-seed1-u-0.01', 'npy')]:
+            os.makedirs(os.path.join(self._folder, '100', 'reward_data', agent), exist_ok=True)
+            ResultStore(result_format).save(self._data, os.path.join(self._folder, '100', 'reward_data', agent, name))
+        
+    def tearDown(self):
+        shutil.rmtree(self._folder)
+        del(self._data)
+
+    def testDiscover(self):
+        index = ResultIndex(self._folder)
+        
+        self.assertEqual(len(index.entries), 3)
+        self.assertEqual(len(index.find(agent='advice-synthetic-all')), 2)
+        self.assertEqual(sorted(entry.get_parameter('2x2-seed1', 'u') for entry in index.find(agent='advice-synthetic-all')), [0.01, 0.2])
+        self.assertIsNone(index.find_one(100, 'reward', 'noadvice', '2x2-seed1').get_parameter('2x2-seed1', 'u'))
+    
+    def testLoad(self):
+        index = ResultIndex(self._folder, workers=2)
+        
+        for data_frame in index.load(index.find()):
+            self.assertTrue(np.array_equal(data_frame.to_numpy(), self._data))
+    
+    def testResultsAreLoadedOnce(self):
+        index = ResultIndex(self._folder)
+        
+        self.assertIs(index.get(100, 'reward', 'noadvice', '2x2-seed1'), index.get(100, 'reward', 'noadvice', '2x2-seed1'))
+    
+    def testParsedCsvIsCachedUntilChanged(self):
+        ResultIndex(self._folder).get(100, 'reward', 'advice-synthetic-all', '2x2-seed1-u-0.2')
+        self.assertEqual(len(os.listdir(os.path.join(self._folder, '.analysis-cache'))), 1)
+        
+        ResultStore('csv').save(self._data * 2, os.path.join(self._folder, '100', 'reward_data', 'advice-synthetic-all', '2x2-seed1-u-0.2'))
+        data_frame = ResultIndex(self._folder).get(100, 'reward', 'advice-synthetic-all', '2x2-seed1-u-0.2')
+        
+        self.assertTrue(np.array_equal(data_frame.to_numpy(), self._data * 2))
+    
+    def testMissingResult(self):
+        with self.assertRaises(Exception):
+            ResultIndex(self._folder).get(100, 'reward', 'random', '2x2-seed1')
+
+
+if __name__ == '__main__':
+    unittest.main()
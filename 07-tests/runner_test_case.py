@@ -0,0 +1,25 @@
+import os
+import shutil
+import tempfile
+import unittest
+from src.results_store import ResultStore
+
+
+class RunnerTestCase(unittest.TestCase):
+    """
+    Runs every test in a temporary working folder holding the default 4x4 map, as runners read their map from ./03-input
+    and write to ./05-experiments
+    """
+
+    def setUp(self):
+        self._folder = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self._folder)
+        self.addCleanup(os.chdir, os.getcwd())
+        os.chdir(self._folder)
+
+        os.makedirs('03-input')
+        with open('03-input/lake-4x4-seed1.txt', 'w') as file:
+            file.write('SFFF\nFHFH\nFFFH\nHFFG')
+
+    def get_results(self, name, episodes, agent='noadvice'):
+        return [ResultStore().load(f'05-experiments/{name}/{episodes}/{data_kind}_data/{agent}/4x4-seed1') for data_kind in ['reward', 'policy']]
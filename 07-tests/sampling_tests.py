@@ -0,0 +1,41 @@
+import logging
+import unittest
+import numpy as np
+from scipy.special import softmax
+from src.runner import Runner
+from .runner_test_case import RunnerTestCase
+
+
+class SamplingTests(RunnerTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self._runner = Runner(4, 1, 1, [10], logging.WARNING, cache=False)
+
+    def testSampleActionDrawsAsGeneratorChoice(self):
+        distributions = [[0.25, 0.25, 0.25, 0.25], [0.1, 0.2, 0.3, 0.4], [0.0, 0.5, 0.0, 0.5], [1e-12, 1e-12, 1-2e-12, 0.0]]
+        # softmax of numerical preferences as in training, whose sums are off from 1 by rounding errors
+        distributions += list(softmax(np.random.default_rng(1).normal(scale=3, size=(4, 4)), axis=1))
+
+        for action_probs in distributions:
+            with self.subTest(action_probs=action_probs):
+                rng, choice_rng = np.random.default_rng(2), np.random.default_rng(2)
+                actions = [self._runner.sample_action(action_probs, rng) for _ in range(3000)]
+                expected_actions = [choice_rng.choice(len(action_probs), p=action_probs) for _ in range(3000)]
+
+                self.assertEqual(actions, expected_actions)
+
+    def testActionDistributionsOfBatchedTrainingDrawAsGeneratorChoice(self):
+        preferences = np.random.default_rng(1).normal(scale=3, size=(8, 4))
+        action_probs, cdf = self._runner.get_action_distributions(preferences)
+        rng, choice_rng = np.random.default_rng(2), np.random.default_rng(2)
+
+        actions = [(cdf > rng.random(len(cdf))[:, np.newaxis]).argmax(axis=1) for _ in range(3000)]
+        expected_actions = [[choice_rng.choice(4, p=probs) for probs in action_probs] for _ in range(3000)]
+
+        self.assertTrue(np.allclose(action_probs, softmax(preferences, axis=1)))
+        self.assertEqual(np.array(actions).tolist(), expected_actions)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,10 @@
+import logging
 import os
 import unittest
+import numpy as np
 from src import sl
+from src.runner import Runner
+from .runner_test_case import RunnerTestCase
 
 
 class SLTests(unittest.TestCase):
@@ -48,5 +52,114 @@ class SLTests(unittest.TestCase):
         
         self.assertTrue(opinion_based_probability >= original_probability)
         
+
+class OpinionTableTests(unittest.TestCase):
+    
+    def setUp(self):
+        self._table1 = sl.OpinionTable([0, 1], [0.5, 0.4], [0, 0.6], [0.5, 0], [0.25, 0.25], 2)
+        self._table2 = sl.OpinionTable([0, 1], [0.6, 0.8], [0.2, 0.2], [0.2, 0], [0.25, 0.25], 2)
+        
+    def tearDown(self):
+        del(self._table1)
+        del(self._table2)
+    
+    def testBCF(self):
+        fused_table = sl.belief_constraint_fusion(self._table1, self._table2)
+        
+        self.assertAlmostEqual(fused_table.b[0], 0.7777, delta=0.001)
+        self.assertAlmostEqual(fused_table.d[0], 0.1111, delta=0.001)
+        self.assertAlmostEqual(fused_table.u[0], 0.1111, delta=0.001)
+        self.assertAlmostEqual(fused_table.a[0], 0.25, delta=0.001)
+        
+        self.assertAlmostEqual(fused_table.b[1], 0.727, delta=0.001)
+        self.assertAlmostEqual(fused_table.d[1], 0.273, delta=0.001)
+        self.assertEqual(fused_table.u[1], 0)
+        
+    def testCumulativeFusion(self):
+        fused_table = sl.cumulative_fusion(self._table1, self._table2)
+        
+        self.assertAlmostEqual(fused_table.b[0], 0.6667, delta=0.001)
+        self.assertAlmostEqual(fused_table.u[0], 0.1667, delta=0.001)
+        self.assertAlmostEqual(fused_table.b[1], 0.6, delta=0.001)
+        self.assertEqual(fused_table.u[1], 0)
+        
+    def testAveragingFusion(self):
+        fused_table = sl.averaging_fusion(self._table1, self._table2)
+        
+        self.assertAlmostEqual(fused_table.b[0], 0.5714, delta=0.001)
+        self.assertAlmostEqual(fused_table.u[0], 0.2857, delta=0.001)
+        self.assertAlmostEqual(fused_table.b[1], 0.6, delta=0.001)
+        
+    def testProjectedProbability(self):
+        probabilities = sl.projected_probability(self._table1)
+        
+        self.assertAlmostEqual(probabilities[0], 0.625)
+        self.assertAlmostEqual(probabilities[1], 0.4)
+        
+    def testFusionOfTablesJoinsOnCells(self):
+        table3 = sl.OpinionTable([3, 0], [0.1, 0.5], [0.1, 0], [0.8, 0.5], [0.25, 0.25], 2)
+        fused_table = sl.fuse_opinion_tables([self._table1, self._table2, table3])
+        
+        self.assertEqual(fused_table.cells.tolist(), [0, 1, 3])
+        self.assertAlmostEqual(fused_table.b[2], 0.1)
+        
+        expected_table = sl.belief_constraint_fusion(sl.belief_constraint_fusion(self._table1, self._table2).take([0]), table3.take([1]))
+        self.assertAlmostEqual(fused_table.b[0], expected_table.b[0])
+        self.assertAlmostEqual(fused_table.u[0], expected_table.u[0])
+        
+    def testConversionToAdvisorOpinions(self):
+        advisor_opinions = self._table2.to_advisor_opinions()
+        
+        self.assertEqual(len(advisor_opinions.opinion_list), 2)
+        self.assertEqual(advisor_opinions.opinion_list[1].cell.row, 0)
+        self.assertEqual(advisor_opinions.opinion_list[1].cell.col, 1)
+        
+        table = sl.OpinionTable.from_advisor_opinions(advisor_opinions)
+        self.assertEqual(table.cells.tolist(), [0, 1])
+        self.assertEqual(table.b.tolist(), [0.6, 0.8])
+
+
+class ShapingTests(RunnerTestCase):
+    """
+    Shapes the uniform policy of the 4x4 map with synthetic advice. Every action into an advised cell gets the projected
+    probability of its fusion with the dogmatic opinion (1/4, 3/4, 0, 1/4) of the policy, (b+u)/4 / (1 - 3b/4 - d/4),
+    before the rows are normalized; e.g. 1/(1+3u) into the goal and u/(3+u) into a hole.
+    """
+
+    def setUp(self):
+        super().setUp()
+        advice = {
+            'holes': '4\n[3,3], +2\n[1,1], -2\n[1,3], -2\n[2,3], -2\n[3,0], -2',
+            'all': '4\n[3,3], +2\n[1,1], -2\n[1,3], -2\n[2,3], -2\n[3,0], -2\n[0,0], +1\n[0,1], +0\n[0,2], +1\n[0,3], +0\n'
+                '[1,0], +0\n[1,2], -1\n[2,0], +0\n[2,1], +0\n[2,2], +0\n[3,1], +0\n[3,2], +1'
+        }
+        for quota, lines in advice.items():
+            with open(f'03-input/advice-4x4-seed1-{quota}.txt', 'w') as file:
+                file.write(lines)
+        self._runner = Runner(4, 1, 1, [10], logging.WARNING, cache=False)
+
+    def testShapedPolicyMatchesFixture(self):
+        # rows of the states 1 and 4 (next to the hole at [1,1]) and 14 (next to the goal)
+        expected_rows = {
+            ('all', 0.01): [[0.397871, 0.002679, 0.397871, 0.201579], [0.250811, 0.250811, 0.003333, 0.495044], [0.145275, 0.145275, 0.564175, 0.145275]],
+            ('all', 0.2): [[0.359551, 0.05618, 0.359551, 0.224719], [0.25974, 0.25974, 0.064935, 0.415584], [0.181818, 0.181818, 0.454545, 0.181818]],
+            ('all', 0.8): [[0.270513, 0.209816, 0.270513, 0.249157], [0.254594, 0.254594, 0.214395, 0.276417], [0.239437, 0.239437, 0.28169, 0.239437]],
+            ('holes', 0.01): [[0.331863, 0.00441, 0.331863, 0.331863], [0.331863, 0.331863, 0.00441, 0.331863], [0.145275, 0.145275, 0.564175, 0.145275]],
+            ('holes', 0.2): [[0.307692, 0.076923, 0.307692, 0.307692], [0.307692, 0.307692, 0.076923, 0.307692], [0.181818, 0.181818, 0.454545, 0.181818]],
+            ('holes', 0.8): [[0.260274, 0.219178, 0.260274, 0.260274], [0.260274, 0.260274, 0.219178, 0.260274], [0.239437, 0.239437, 0.28169, 0.239437]]
+        }
+        default_policy = self._runner.get_default_policy(self._runner.get_environment())
+
+        for (quota, u), rows in expected_rows.items():
+            with self.subTest(quota=quota, u=u):
+                advice = self._runner.prepare_experiment_synthetic(quota, u).advice
+                policy = self._runner.shape_policy(default_policy, advice)
+
+                self.assertTrue(np.allclose(policy[[1, 4, 14]], rows, atol=1e-6))
+                self.assertTrue(np.allclose(policy.sum(axis=1), 1))
+                # the start state borders only cells advised as neutral (or not advised), and keeps its uniform row
+                self.assertTrue(np.allclose(policy[0], 0.25))
+
+
 if __name__ == "__main__":
     unittest.main()
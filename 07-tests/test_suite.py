@@ -1,10 +1,22 @@
 #!/usr/bin/env python
 import unittest
 
+from .advice_parser_tests import AdviceParserTests
+from .advice_tools_tests import AdviceToolsTests
+from .batched_training_tests import BatchedTrainingTests
+from .cache_tests import ResultCacheTests, ResultCacheKeyTests
+from .checkpoint_tests import CheckpointTests
+from .early_stopping_tests import EarlyStoppingTests
+from .frozen_lake_tests import FrozenLakeTests
 from .grid_tests import GridTests
+from .incremental_tests import IncrementalTests
+from .map_tools_tests import MapToolsTests
 from .model_tests import ModelTests
 from .opinion_parser_tests import OpinionParserTests
-from .sl_tests import SLTests
+from .result_summary_tests import ResultSummaryTests
+from .results_index_tests import ResultIndexTests
+from .sampling_tests import SamplingTests
+from .sl_tests import SLTests, OpinionTableTests, ShapingTests
 
 
 """
@@ -12,7 +24,7 @@ Full test suite
 """
 
 def create_suite():
-    testCases = [GridTests, ModelTests, OpinionParserTests, SLTests]
+    testCases = [AdviceParserTests, AdviceToolsTests, BatchedTrainingTests, ResultCacheTests, ResultCacheKeyTests, CheckpointTests, EarlyStoppingTests, FrozenLakeTests, GridTests, IncrementalTests, MapToolsTests, ModelTests, OpinionParserTests, ResultSummaryTests, ResultIndexTests, SamplingTests, SLTests, OpinionTableTests, ShapingTests]
     loadedCases = []
     
     for case in testCases:
@@ -0,0 +1,274 @@
+import argparse
+import json
+import logging
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import timeit
+from datetime import datetime
+import numpy as np
+
+SOURCE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '04-src')
+sys.path.insert(0, SOURCE_PATH)
+
+import sl
+from advice_parser import AdviceParser
+from advice_tools import generate_advice_files
+from map_tools import MapTools
+from model import Direction, Grid, HumanAdvisorOpinions
+from result_summary import ResultSummary
+from results_index import ResultIndex
+from results_store import ResultStore
+from runner import Runner
+
+"""
+Benchmarks of the hot paths of training, shaping, fusion, parsing and analysis at several map sizes.
+
+Every benchmark runs in a temporary workspace with its own solvable map and generated advice per size, so the numbers do
+not depend on the contents of 03-input. Results are the minimum and median wall time over the repetitions; they can be
+saved as a JSON baseline and compared against one later.
+"""
+class Benchmarks():
+
+    def __init__(self, sizes, seed=1, repeat=3, episodes=1000, experiments=30):
+        self._SIZES = sizes
+        self._SEED = seed
+        self._REPEAT = repeat
+        self._EPISODES = episodes
+        self._EXPERIMENTS = experiments
+        self._BASERATE = 0.25
+
+        self.benchmarks = {
+            'training': self.benchmark_training,
+            'training_batched': self.benchmark_training_batched,
+            'shaping': self.benchmark_shaping,
+            'cell_geometry': self.benchmark_cell_geometry,
+            'grid_construction': self.benchmark_grid_construction,
+            'fusion': self.benchmark_fusion,
+            'advice_parsing': self.benchmark_advice_parsing,
+            'map_parsing': self.benchmark_map_parsing,
+            'analysis_loading_npy': self.benchmark_analysis_loading_npy,
+            'analysis_loading_csv': self.benchmark_analysis_loading_csv,
+            'analysis_loading_csv_cached': self.benchmark_analysis_loading_csv_cached,
+            'analysis_summaries': self.benchmark_analysis_summaries
+        }
+
+    def prepare_workspace(self):
+        self._WORKSPACE = tempfile.mkdtemp(prefix='benchmarks-')
+        self._PREVIOUS_FOLDER = os.getcwd()
+        os.chdir(self._WORKSPACE)
+
+        MapTools('./02-maps').generate_maps(self._SIZES, [self._SEED])
+        generate_advice_files(self._SIZES, [self._SEED], ['all', 'sample10'])
+        shutil.copytree('./02-maps', './03-input')
+
+    def clean_workspace(self):
+        os.chdir(self._PREVIOUS_FOLDER)
+        shutil.rmtree(self._WORKSPACE)
+
+    def measure(self, function, scale=1.0, unit='s per call', calls=None):
+        # fast functions are called repeatedly within every repetition, until one repetition takes at least 0.2 seconds
+        timer = timeit.Timer(function)
+        calls = calls if calls is not None else timer.autorange()[0]
+        times = [time / calls * scale for time in timer.repeat(repeat=self._REPEAT, number=calls)]
+
+        return {'min': min(times), 'median': statistics.median(times), 'repeat': self._REPEAT, 'calls': calls, 'unit': unit}
+
+    def get_runner(self, size):
+        return Runner(size, self._SEED, self._EXPERIMENTS, [self._EPISODES], logging.WARNING, rngseed=self._SEED, cache=False)
+
+    def get_synthetic_advice(self, runner, size):
+        return runner.prepare_experiment_synthetic('all', 0.2).advice
+
+    def benchmark_training(self, size):
+        runner = self.get_runner(size)
+        advice = self.get_synthetic_advice(runner, size)
+
+        return self.measure(lambda: runner.discrete_policy_grad(self._EPISODES, advice=advice, rng=np.random.default_rng(self._SEED)),
+            scale=1000/self._EPISODES, unit='s per 1k episodes', calls=1)
+
+    def benchmark_training_batched(self, size):
+        runner = self.get_runner(size)
+        advice = self.get_synthetic_advice(runner, size)
+        num_agents = self._EXPERIMENTS
+
+        return self.measure(lambda: runner.discrete_policy_grad_batch(self._EPISODES, num_agents, advice=advice, rng=np.random.default_rng(self._SEED)),
+            scale=1000/(self._EPISODES*num_agents), unit='s per 1k episodes', calls=1)
+
+    def benchmark_shaping(self, size):
+        runner = self.get_runner(size)
+        advice = self.get_synthetic_advice(runner, size)
+        policy = runner.get_default_policy(runner.get_environment())
+
+        return self.measure(lambda: runner.shape_policy(policy, advice))
+
+    def benchmark_cell_geometry(self, size):
+        cells = Grid(size).cells
+
+        # one pass of the geometry queries of advice conversion and shaping over every cell of the map
+        def query_cells():
+            for cell in cells:
+                cell.get_neighbors()
+                cell.get_cell_in_direction(Direction.DOWN)
+                cell.get_actions_to_me_from_all_neighbors()
+
+        return self.measure(query_cells, unit='s per pass over the map')
+
+    def benchmark_grid_construction(self, size):
+        # a new grid, and the first query of every one of its cells
+        return self.measure(lambda: [cell.get_neighbors() for cell in Grid(size).cells], unit='s per grid')
+
+    def benchmark_fusion(self, size):
+        advisor_input = AdviceParser().parse(f'./03-input/advice-{size}x{size}-seed{self._SEED}-all.txt')
+        advisor1_opinions = HumanAdvisorOpinions(advisor_input, 'topleft', self._BASERATE)
+        advisor2_opinions = HumanAdvisorOpinions(advisor_input, 'bottomright', self._BASERATE)
+
+        return self.measure(lambda: sl.fuse_advisor_opinions(advisor1_opinions, advisor2_opinions))
+
+    def benchmark_advice_parsing(self, size):
+        file = f'./03-input/advice-{size}x{size}-seed{self._SEED}-all.txt'
+
+        return self.measure(lambda: AdviceParser().parse(file))
+
+    def benchmark_map_parsing(self, size):
+        map_tools = MapTools('./03-input')
+
+        return self.measure(lambda: map_tools.parse_map(size, self._SEED))
+
+    def get_experiment_folder(self, size, result_format):
+        # policy results and summaries of a synthetic experiment, laid out as the runner writes them
+        folder = f'./05-experiments/benchmark-{size}x{size}-{result_format}'
+        if not os.path.exists(folder):
+            data = np.random.default_rng(self._SEED).random((self._EXPERIMENTS, size**2 * 4))
+            names = [('noadvice', ''), ('random', '')] + [('advice-synthetic-all', f'-u-{u}') for u in [0.01, 0.2, 0.4, 0.6, 0.8]]
+            for agent, suffix in names:
+                os.makedirs(f'{folder}/{self._EPISODES}/policy_data/{agent}', exist_ok=True)
+                file_name = f'{folder}/{self._EPISODES}/policy_data/{agent}/{size}x{size}-seed{self._SEED}{suffix}'
+                ResultStore(result_format).save(data, file_name, {'rows': len(data), 'columns': data.shape[1], 'completed': len(data)})
+                ResultSummary.from_rows(data).save(file_name)
+
+        return folder
+
+    def measure_loading(self, folder, cache):
+        # every call is a new analysis: the folder is indexed and all results are loaded through the index, and summed so
+        # that memory-mapped data is actually read
+        def load():
+            index = ResultIndex(folder, cache=cache)
+            return sum(data_frame.to_numpy().sum() for data_frame in index.load(index.entries))
+
+        return self.measure(load, unit='s per experiment')
+
+    def benchmark_analysis_loading_npy(self, size):
+        return self.measure_loading(self.get_experiment_folder(size, 'npy'), cache=False)
+
+    def benchmark_analysis_loading_csv(self, size):
+        return self.measure_loading(self.get_experiment_folder(size, 'csv'), cache=False)
+
+    def benchmark_analysis_loading_csv_cached(self, size):
+        folder = self.get_experiment_folder(size, 'csv')
+        ResultIndex(folder).load(ResultIndex(folder).entries)
+
+        return self.measure_loading(folder, cache=True)
+
+    def benchmark_analysis_summaries(self, size):
+        folder = self.get_experiment_folder(size, 'npy')
+
+        def load_summaries():
+            index = ResultIndex(folder, cache=False)
+            return index.load_summaries(index.entries)
+
+        return self.measure(load_summaries, unit='s per experiment')
+
+    def run(self, names=None):
+        names = names if names is not None else list(self.benchmarks)
+        results = {}
+
+        self.prepare_workspace()
+        try:
+            for name in names:
+                for size in self._SIZES:
+                    results[f'{name}/{size}'] = self.benchmarks[name](size)
+                    logging.info(f'{name}/{size}: {format_result(results[f"{name}/{size}"])}')
+        finally:
+            self.clean_workspace()
+
+        return {'metadata': self.get_metadata(), 'results': results}
+
+    def get_metadata(self):
+        return {
+            'date': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'processor': platform.processor(),
+            'sizes': self._SIZES,
+            'seed': self._SEED,
+            'repeat': self._REPEAT,
+            'episodes': self._EPISODES,
+            'experiments': self._EXPERIMENTS
+        }
+
+
+def format_result(result):
+    return f"min {result['min']:.6f} {result['unit']}, median {result['median']:.6f} {result['unit']}"
+
+'''
+Compares the minimum times of two benchmark runs; returns the benchmarks that got slower by more than the threshold (e.g. 0.1 for 10%)
+'''
+def compare(results, baseline, threshold=0.1):
+    regressions = []
+    for name, result in results['results'].items():
+        if name not in baseline['results']:
+            print(f'{name:32} {"(no baseline)":>12}')
+            continue
+
+        ratio = result['min'] / baseline['results'][name]['min']
+        regression = ratio > 1 + threshold
+        if regression:
+            regressions.append(name)
+        print(f'{name:32} {ratio:11.2f}x {"REGRESSION" if regression else ""}')
+
+    return regressions
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', type=int, nargs='+', default=[4, 12, 32, 64], help='Map sizes to benchmark.')
+    parser.add_argument('--benchmarks', nargs='+', help='Benchmarks to run (default: all).')
+    parser.add_argument('--repeat', type=int, default=3, help='Repetitions of every benchmark.')
+    parser.add_argument('--episodes', type=int, default=1000, help='Episodes of the training benchmarks.')
+    parser.add_argument('--seed', type=int, default=1, help='Seed of the benchmark maps and of training.')
+    parser.add_argument('--save', help='Write the results to this JSON file (e.g. as a new baseline).')
+    parser.add_argument('--compare', help='Compare the results against this JSON baseline and exit with an error on regressions.')
+    parser.add_argument('--threshold', type=float, default=0.1, help='Relative slowdown counted as a regression (default: 0.1 = 10%%).')
+    options = parser.parse_args()
+
+    # absolute paths, the benchmarks run in a temporary workspace
+    save_file = os.path.abspath(options.save) if options.save else None
+    baseline_file = os.path.abspath(options.compare) if options.compare else None
+
+    benchmarks = Benchmarks(options.sizes, seed=options.seed, repeat=options.repeat, episodes=options.episodes)
+    unknown_benchmarks = set(options.benchmarks or []) - set(benchmarks.benchmarks)
+    if unknown_benchmarks:
+        parser.error(f'unknown benchmarks: {", ".join(sorted(unknown_benchmarks))}')
+
+    logging.basicConfig(format='[%(levelname)s] %(message)s')
+    results = benchmarks.run(options.benchmarks)
+    for name, result in results['results'].items():
+        print(f'{name:32} {format_result(result)}')
+
+    if save_file is not None:
+        with open(save_file, 'w') as file:
+            json.dump(results, file, indent=2)
+
+    if baseline_file is not None:
+        with open(baseline_file, 'r') as file:
+            baseline = json.load(file)
+        print(f'\nCompared to {baseline_file} ({baseline["metadata"]["date"]}), threshold {options.threshold:.0%}:')
+        regressions = compare(results, baseline, options.threshold)
+        if regressions:
+            print(f'{len(regressions)} regression(s): {", ".join(regressions)}')
+            sys.exit(1)